@@ -0,0 +1,68 @@
+# bench_neo4j_loader.py
+# - Times neo4j-api-demo/neo4j_bulk_loader.py against the stub driver from tests/neo4j_stub.py (no Neo4j server needed)
+# - The stub sleeps a configurable write latency per batch, so the effect of batch size and parallel workers shows up
+#   without a server; correctness checks live in tests/test_neo4j_bulk_loader.py
+#
+#   python benchmarks/bench_neo4j_loader.py --rows 20000 --batch-size 500 --workers 1 4
+#   python benchmarks/bench_neo4j_loader.py --live   # same loads against NEO4J_URI from .env
+
+import argparse
+import json
+import os
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.append(os.path.join(ROOT, 'neo4j-api-demo'))
+sys.path.append(os.path.join(ROOT, 'tests'))
+from neo4j_bulk_loader import BulkLoader, close_driver, get_driver
+from neo4j_stub import CountingRows, StubDriver
+
+
+def people(rows):
+    return ({"name": f"person-{i}", "age": i % 90} for i in range(rows))
+
+
+def bench_nodes(rows, batch_size, workers, latency):
+    driver = StubDriver(latency)
+    loader = BulkLoader(driver=driver, batch_size=batch_size, workers=workers)
+    loader.create_index("Person", "name")
+    source = CountingRows(people(rows), driver)
+    stats = loader.load_nodes("Person", source, key="name")
+    return {"workers": workers, "max_sessions": driver.max_active, "max_rows_ahead": source.max_ahead, **stats}
+
+
+def bench_relationships(rows, batch_size, workers, latency):
+    loader = BulkLoader(driver=StubDriver(latency), batch_size=batch_size, workers=workers)
+    knows = ({"start": f"person-{i}", "end": f"person-{i + 1}"} for i in range(rows))
+    return {"workers": workers, **loader.load_relationships("KNOWS", knows, "Person", "Person", "name", "name")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the Neo4j bulk loader against a stub driver.")
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--latency", type=float, default=0.005, help="simulated seconds per batch write")
+    parser.add_argument("--live", action="store_true", help="load into the Neo4j server from .env instead")
+    args = parser.parse_args()
+
+    if args.live:
+        try:
+            for workers in args.workers:
+                loader = BulkLoader(get_driver(), batch_size=args.batch_size, workers=workers)
+                loader.create_index("BenchPerson", "name")
+                print(json.dumps({"workers": workers,
+                                  **loader.load_nodes("BenchPerson", people(args.rows), key="name")}))
+        finally:
+            close_driver()
+        return
+
+    results = {"nodes": [], "relationships": []}
+    for workers in args.workers:
+        results["nodes"].append(bench_nodes(args.rows, args.batch_size, workers, args.latency))
+        results["relationships"].append(bench_relationships(args.rows, args.batch_size, workers, args.latency))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
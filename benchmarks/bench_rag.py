@@ -0,0 +1,272 @@
+# bench_rag.py
+# - Offline benchmark of the RAG chatbot pipeline with stub Gemini backends
+# - genai.embed_content and GenerativeModel.generate_content are replaced by deterministic
+#   local stubs with configurable latency, so no GOOGLE_API_KEY or network is needed
+#
+#   python benchmarks/bench_rag.py --sizes 100 1000 10000 100000 --output bench.json
+#   python benchmarks/bench_rag.py --compare old.json new.json
+
+import argparse
+import contextlib
+import datetime
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+APP_DIR = os.path.join(ROOT, 'gemini-app')
+sys.path.append(APP_DIR)
+
+import google.generativeai as genai
+
+DIM = 768
+WORDS = ("gemini model multimodal safety evaluation research google data text code audio image video "
+         "training fine tuned benchmark latency token prompt passage vector index embedding query answer "
+         "chatbot context retrieval document corpus cache batch stream session metric").split()
+
+
+class StubUsage:
+    def __init__(self, prompt_token_count, candidates_token_count):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+
+
+class StubChunk:
+    def __init__(self, text):
+        self.text = text
+
+
+class StubResponse:
+    """Looks enough like a GenerateContentResponse for the chatbots: text, usage_metadata, iteration."""
+
+    def __init__(self, text, prompt):
+        self.text = text
+        self.usage_metadata = StubUsage(len(prompt) // 4 + 1, len(text) // 4 + 1)
+        self._chunks = [text[i:i + 40] for i in range(0, len(text), 40)]
+
+    def __iter__(self):
+        return iter(StubChunk(part) for part in self._chunks)
+
+
+def stub_embedding(text):
+    """Deterministic unit vector from hashed words, so texts sharing words get similar embeddings."""
+    vector = np.zeros(DIM, dtype=np.float32)
+    for word in text.lower().split():
+        digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+        rng = np.random.default_rng(int.from_bytes(digest, "little"))
+        vector += rng.standard_normal(DIM).astype(np.float32)
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).tolist()
+
+
+def install_stubs(embed_latency=0.0, generate_latency=0.0):
+    """Replace the Gemini network calls with local stubs sleeping for the given seconds per call."""
+
+    def embed_content(model, content, task_type=None, title=None, **kwargs):
+        time.sleep(embed_latency)
+        if isinstance(content, str):
+            return {"embedding": stub_embedding(content)}
+        return {"embedding": [stub_embedding(text) for text in content]}
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        time.sleep(generate_latency)
+        prompt = contents if isinstance(contents, str) else str(contents)
+        answer = "Stub answer: " + " ".join(prompt.split()[-30:])
+        return StubResponse(answer, prompt)
+
+    genai.embed_content = embed_content
+    genai.GenerativeModel.generate_content = generate_content
+
+
+def load_chatbot_module():
+    path = os.path.join(APP_DIR, 'gemini-rag-chatbot.py')
+    spec = importlib.util.spec_from_file_location('gemini_rag_chatbot', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def make_corpus(size, words_per_doc=60, seed=0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(words_per_doc)) for _ in range(size)]
+
+
+def make_queries(count, seed=1):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(WORDS) for _ in range(6)) for _ in range(count)]
+
+
+def latency_summary(samples):
+    ordered = sorted(samples)
+    return {
+        "n": len(ordered),
+        "mean_ms": 1000 * sum(ordered) / len(ordered),
+        "p50_ms": 1000 * ordered[len(ordered) // 2],
+        "p95_ms": 1000 * ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+        "per_second": len(ordered) / sum(ordered) if sum(ordered) else 0.0,
+    }
+
+
+def timed(func, inputs):
+    samples = []
+    for item in inputs:
+        start = time.perf_counter()
+        func(item)
+        samples.append(time.perf_counter() - start)
+    return latency_summary(samples)
+
+
+def new_bot(module, backend, workdir):
+    with contextlib.redirect_stdout(io.StringIO()):
+        bot = module.RAGChatBot()
+    bot.embedding_function = module.GeminiEmbeddingFunction(cache=None)  # measure real ingestion, not cache reads
+    bot.semantic_cache = None
+    bot.stream = False
+    bot.backend = backend
+    bot.index_path = os.path.join(workdir, f"index-{backend}")
+    shutil.rmtree(bot.index_path, ignore_errors=True)  # always measure a cold build
+    return bot
+
+
+def bench_backend(module, backend, documents, queries, workdir):
+    bot = new_bot(module, backend, workdir)
+    bot.documents = documents
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        bot.create_chroma_db()
+    ingest = time.perf_counter() - start
+
+    def retrieve(query):
+        bot.query = query
+        bot.get_relevant_passage()
+
+    def prompt(query):
+        bot.query = query
+        bot.make_prompt()
+
+    bot.query = queries[0]
+    bot.get_relevant_passage()
+    result = {
+        "backend": backend,
+        "docs": len(documents),
+        "ingest": {"seconds": ingest, "docs_per_second": len(documents) / ingest},
+        "retrieval": timed(retrieve, queries),
+        "make_prompt": timed(prompt, queries),
+        "chat_turn": timed(bot.answer, queries),
+    }
+    return bot, result
+
+
+def parity(chroma_db, numpy_db, queries, embed, k=5):
+    """Fraction of queries where both backends agree on top-1 and on the top-k id set."""
+    embeddings = embed(queries)
+    a = chroma_db.query(query_embeddings=embeddings, n_results=k)["ids"]
+    b = numpy_db.query(query_embeddings=embeddings, n_results=k)["ids"]
+    return {
+        "k": k,
+        "top1_agreement": sum(x[0] == y[0] for x, y in zip(a, b)) / len(queries),
+        "topk_agreement": sum(set(x) == set(y) for x, y in zip(a, b)) / len(queries),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old_path, new_path):
+    """Print new/old ratios of the headline numbers for matching (backend, docs) rows."""
+    with open(old_path) as f:
+        old = {(r["backend"], r["docs"]): r for r in json.load(f)["results"]}
+    with open(new_path) as f:
+        new = json.load(f)["results"]
+    for row in new:
+        base = old.get((row["backend"], row["docs"]))
+        if base is None:
+            continue
+        ratios = {
+            "ingest_s": row["ingest"]["seconds"] / base["ingest"]["seconds"],
+            "retrieval_p50": row["retrieval"]["p50_ms"] / base["retrieval"]["p50_ms"],
+            "make_prompt_p50": row["make_prompt"]["p50_ms"] / base["make_prompt"]["p50_ms"],
+            "chat_turn_p50": row["chat_turn"]["p50_ms"] / base["chat_turn"]["p50_ms"],
+        }
+        print(f"{row['backend']:>6} {row['docs']:>7} " + " ".join(f"{k}={v:.2f}x" for k, v in ratios.items()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline RAG chatbot benchmark with stub Gemini backends.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000, 100000])
+    parser.add_argument("--backends", nargs="+", default=["chroma", "numpy"],
+                        choices=["chroma", "numpy", "snapshot"])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--embed-latency", type=float, default=0.0, help="simulated seconds per embed call")
+    parser.add_argument("--generate-latency", type=float, default=0.0, help="simulated seconds per generate call")
+    parser.add_argument("--workdir", default=os.path.join(ROOT, "cache", "bench"))
+    parser.add_argument("--output", help="JSON file for results (default: stdout)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    # resolve user paths before the chdir below
+    args.workdir = os.path.abspath(args.workdir)
+    if args.output:
+        args.output = os.path.abspath(args.output)
+
+    install_stubs(args.embed_latency, args.generate_latency)
+    module = load_chatbot_module()
+    os.makedirs(args.workdir, exist_ok=True)
+    os.chdir(args.workdir)  # keep cache and log files of the bots out of the tree
+    queries = make_queries(args.queries)
+
+    results = []
+    for size in args.sizes:
+        documents = make_corpus(size)
+        dbs = {}
+        for backend in args.backends:
+            bot, result = bench_backend(module, backend, documents, queries, args.workdir)
+            dbs[backend] = bot.db
+            results.append(result)
+            print(f"{backend:>6} {size:>7} docs: ingest {result['ingest']['docs_per_second']:.0f} docs/s, "
+                  f"retrieval p50 {result['retrieval']['p50_ms']:.2f} ms", file=sys.stderr)
+        if "chroma" in dbs:
+            for row, backend in zip(results[-len(dbs):], dbs):
+                if backend != "chroma":
+                    row["parity_with_chroma"] = parity(dbs["chroma"], dbs[backend], queries, bot.embedding_function)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "embed_latency": args.embed_latency,
+            "generate_latency": args.generate_latency,
+            "queries": args.queries,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
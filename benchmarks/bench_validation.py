@@ -0,0 +1,51 @@
+# bench_validation.py
+# - Micro-benchmark: per-float Python validation of embeddings vs. one NumPy conversion
+# - Runs offline, no API key needed
+#   python benchmarks/bench_validation.py --docs 10000 --dim 768
+
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'gemini-app'))
+from vector_index import as_embedding_matrix
+
+
+def validate_loops(embeddings):
+    """The original generator-based checks from create_chroma_db."""
+    if not isinstance(embeddings, list) or not all(isinstance(embedding, list) for embedding in embeddings):
+        raise ValueError("Embeddings must be a list of lists of numbers.")
+
+    if not all(isinstance(value, (int, float)) for embedding in embeddings for value in embedding):
+        raise ValueError("Embedding elements must be numerical.")
+    return embeddings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-float Python embedding validation with one NumPy conversion.")
+    parser.add_argument("--docs", type=int, default=10000)
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    embeddings = [[rng.uniform(-1, 1) for _ in range(args.dim)] for _ in range(args.docs)]
+
+    loops = min(timeit.repeat(lambda: validate_loops(embeddings), number=1, repeat=args.repeat))
+    vectorized = min(timeit.repeat(lambda: as_embedding_matrix(embeddings, rows=args.docs), number=1, repeat=args.repeat))
+
+    print(json.dumps({
+        "benchmark": "embedding_validation",
+        "docs": args.docs,
+        "dim": args.dim,
+        "python_loops_s": round(loops, 4),
+        "numpy_s": round(vectorized, 4),
+        "speedup": round(loops / vectorized, 1),
+    }))
+
+
+if __name__ == "__main__":
+    main()
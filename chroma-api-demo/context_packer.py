@@ -0,0 +1,96 @@
+# context_packer.py
+# - Top-k context selection for RAG prompts
+# - Maximal marginal relevance re-ranking on the retrieved embeddings, then packing into a token budget
+
+import numpy as np
+
+from vector_index import normalize_rows
+
+
+def estimate_tokens(text):
+    """Rough token count (about 4 characters per token) used for budgeting without an API call."""
+    return len(text) // 4 + 1
+
+
+def mmr(query_embedding, embeddings, k, lambda_mult=0.5, relevance=None):
+    """
+    Order candidates by maximal marginal relevance.
+
+    Args:
+        query_embedding (list or np.ndarray): The query vector.
+        embeddings (list or np.ndarray): One vector per retrieved candidate.
+        k (int): Number of candidates to select.
+        lambda_mult (float): 1.0 ranks by relevance only, 0.0 by diversity only.
+        relevance (list, optional): Relevance per candidate in [0, 1], e.g. fused hybrid scores.
+            Defaults to cosine similarity with the query.
+
+    Returns:
+        list: Indices of the selected candidates, best first.
+    """
+    if embeddings is None or not len(embeddings):
+        return []
+    candidates = normalize_rows(np.asarray(embeddings, dtype=np.float32))
+    if relevance is None:
+        query = normalize_rows(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1))[0]
+        relevance = candidates @ query
+    relevance = np.asarray(relevance, dtype=np.float32)
+    similarity = candidates @ candidates.T
+
+    selected = [int(np.argmax(relevance))]
+    remaining = [i for i in range(len(candidates)) if i != selected[0]]
+    while remaining and len(selected) < k:
+        redundancy = similarity[np.ix_(remaining, selected)].max(axis=1)
+        scores = lambda_mult * relevance[remaining] - (1 - lambda_mult) * redundancy
+        best = remaining[int(np.argmax(scores))]
+        selected.append(best)
+        remaining.remove(best)
+    return selected
+
+
+def pack_context(chunks, token_budget, count_tokens=estimate_tokens):
+    """
+    Return the indices of chunks that fit into token_budget, taken in the given order.
+
+    Chunks that would overflow the budget are skipped so smaller later ones can still fit.
+    If not even the first chunk fits, it is returned alone and should be truncated by the caller.
+    """
+    picked, used = [], 0
+    for i, chunk in enumerate(chunks):
+        tokens = count_tokens(chunk)
+        if used + tokens <= token_budget:
+            picked.append(i)
+            used += tokens
+    return picked or ([0] if chunks else [])
+
+
+def select_context(query_embedding, ids, documents, embeddings, token_budget, k=None, lambda_mult=0.5,
+                   relevance=None):
+    """
+    Pick the best non-redundant retrieved chunks that fit the token budget.
+
+    Without embeddings (lexical-only retrieval) the given order is kept and only packing applies.
+
+    Returns:
+        tuple: (selected ids, selected documents), in MMR order, the first one truncated to the budget if needed.
+    """
+    if not ids:
+        return [], []
+    if embeddings is None:
+        order = list(range(len(ids)))
+    else:
+        order = mmr(query_embedding, embeddings, k or len(ids), lambda_mult, relevance)
+    picked = [order[i] for i in pack_context([documents[j] for j in order], token_budget)]
+    chosen_ids = [ids[i] for i in picked]
+    chosen_docs = [documents[i] for i in picked]
+    if chosen_docs and estimate_tokens(chosen_docs[0]) > token_budget:
+        chosen_docs[0] = chosen_docs[0][:token_budget * 4]
+    return chosen_ids, chosen_docs
+
+
+def reciprocal_rank_fusion(*rankings, k=60):
+    """Fuse ranked id lists into {id: score} with reciprocal rank fusion."""
+    scores = {}
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking):
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank + 1)
+    return scores
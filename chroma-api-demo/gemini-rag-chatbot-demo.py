@@ -11,56 +11,99 @@ from chromadb import Documents, EmbeddingFunction, Embeddings
 import os
 
 from dotenv import load_dotenv
+
+# helper modules next to this script are copies of the gemini-app ones, see tests/test_demo_helpers.py
+from embedding_cache import EmbeddingCache
+from index_sync import IndexSync, content_hash
+from vector_index import as_embedding_matrix
+from context_packer import select_context
+from gemini_call import GeminiCall
+
 class GeminiEmbeddingFunction(EmbeddingFunction):
+  def __init__(self, cache=None, call=None, batch_call=None):
+    self.model = 'models/embedding-001'
+    self.title = "Custom query"
+    self.task_type = "retrieval_document"
+    self.cache = cache
+    self.call = call or GeminiCall(deadline=30.0, hedge=True) # hedge only single-text query embeds
+    self.batch_call = batch_call or GeminiCall(deadline=60.0) # document batches are never hedged
+
+  def embed(self, texts):
+    call = self.call if len(texts) == 1 else self.batch_call
+    return call(genai.embed_content,
+                model=self.model,
+                content=texts,
+                task_type=self.task_type,
+                title=self.title)["embedding"]
+
   def __call__(self, input: Documents) -> Embeddings:
-    model = 'models/embedding-001'
-    title = "Custom query"
-    return genai.embed_content(model=model,
-                                content=input,
-                                task_type="retrieval_document",
-                                title=title)["embedding"]
-def create_chroma_db(documents, name, embedding_function=GeminiEmbeddingFunction()):
+    texts = [input] if isinstance(input, str) else list(input)
+    if self.cache is None:
+      return self.embed(texts)
+    return self.cache.get_or_embed(self.model, self.task_type, self.title, texts, self.embed)
+def create_chroma_db(documents, name, embedding_function=GeminiEmbeddingFunction(), path=None):
     """
     Creates a ChromaDB collection, generates embeddings for the documents using the provided embedding function, and adds the documents and embeddings to the collection.
 
+    With a persistent path, the existing collection is reused and only synced: new documents are added,
+    changed ones are upserted and removed ones are deleted, so an unchanged corpus needs no embedding calls.
+
     Args:
         documents (list): A list of documents to be added to the collection.
         name (str): The name of the collection.
         embedding_function (EmbeddingFunction, optional): The function used to generate embeddings for the documents. Defaults to GeminiEmbeddingFunction().
+        path (str, optional): Directory of a persistent collection. Defaults to None (in-memory, rebuilt from scratch).
 
     Returns:
         chromadb.Collection: The created ChromaDB collection.
     """
 
-    chroma_client = chromadb.Client()
-    db = chroma_client.create_collection(name=name, embedding_function=GeminiEmbeddingFunction())
-
-    # Generate embeddings
-    embeddings = embedding_function(documents)
-    #print("Embeddings generated:", embeddings)
-
-    # Verify data types
-    if not isinstance(embeddings, list) or not all(isinstance(embedding, list) for embedding in embeddings):
-        raise ValueError("Embeddings must be a list of lists of numbers.")
-
-    if not all(isinstance(value, (int, float)) for embedding in embeddings for value in embedding):
-        raise ValueError("Embedding elements must be numerical.")
-
-    # Add documents and embeddings
-    try:
-        db.add(
-            documents=documents,
-            embeddings=embeddings,
-            ids=[str(i) for i in range(len(documents))]
-        )
-        #print("Documents and embeddings added successfully.")
-    except Exception as e:
-        print(f"Error adding documents and embeddings: {e}")
+    if path:
+        chroma_client = chromadb.PersistentClient(path=path)
+        db = chroma_client.get_or_create_collection(name=name, embedding_function=embedding_function)
+        sync = IndexSync(db)
+        changed = list(sync.changed((str(i), d) for i, d in enumerate(documents)))
+    else:
+        chroma_client = chromadb.Client()
+        db = chroma_client.create_collection(name=name, embedding_function=embedding_function)
+        sync = None
+        changed = [(str(i), d) for i, d in enumerate(documents)]
+
+    ids = [doc_id for doc_id, _ in changed]
+    documents = [doc for _, doc in changed]
+
+    if documents:
+        # Generate embeddings
+        embeddings = embedding_function(documents)
+        #print("Embeddings generated:", embeddings)
+
+        # Verify shape, dtype and values in one pass and convert to a float32 array
+        embeddings = as_embedding_matrix(embeddings, rows=len(documents))
+
+        # Add documents and embeddings
+        try:
+            db.upsert(
+                documents=documents,
+                embeddings=embeddings,
+                metadatas=[{"hash": content_hash(doc)} for doc in documents],
+                ids=ids
+            )
+            #print("Documents and embeddings added successfully.")
+        except Exception as e:
+            print(f"Error adding documents and embeddings: {e}")
+
+    if sync is not None:
+        sync.delete_removed()
+        print(f"Index sync: {sync.summary()}")
 
     return db
 
-def get_relevant_passage(query, db):
-  passage = db.query(query_texts=[query], n_results=1)['documents'][0][0]
+def get_relevant_passage(query, db, embedding_function=GeminiEmbeddingFunction(), n_results=4, token_budget=800):
+  """Retrieve n_results chunks, drop redundant ones with MMR and join the best ones that fit token_budget."""
+  embedding = embedding_function([query])[0]
+  result = db.query(query_embeddings=[embedding], n_results=n_results, include=['documents', 'embeddings'])
+  _, docs = select_context(embedding, result['ids'][0], result['documents'][0], result['embeddings'][0], token_budget)
+  passage = " ... ".join(docs)
   return passage
 
 def make_prompt(query, relevant_passage):
@@ -78,7 +121,7 @@ def make_prompt(query, relevant_passage):
 
   return prompt
 
-def main():
+def main(persist_path=None):
   load_dotenv()
 
   genai.configure(api_key=os.environ["GOOGLE_API_KEY"])
@@ -88,20 +131,23 @@ def main():
   DOCUMENT3 = "Gemini has the most comprehensive safety evaluations of any Google AI model to date, including for bias and toxicity. We’ve conducted novel research into potential risk areas like cyber-offense, persuasion and autonomy, and have applied Google Research’s best-in-class adversarial testing techniques to help identify critical safety issues in advance of Gemini’s deployment."
   documents = [DOCUMENT1, DOCUMENT2, DOCUMENT3]
 
-  client = chromadb.Client()
+  if not persist_path:
+    client = chromadb.Client()
 
-  collections = client.list_collections
+    collections = client.list_collections
 
-  for collection_name in (collection.name for collection in collections()):
-    if "geminidb" in collection_name:
-        print("Collection 'geminidb' exists, will remove it.")
-        client.delete_collection(name="geminidb")
-    else:
-        print("Collection 'geminidb' does not exist.")
+    for collection_name in (collection.name for collection in collections()):
+      if "geminidb" in collection_name:
+          print("Collection 'geminidb' exists, will remove it.")
+          client.delete_collection(name="geminidb")
+      else:
+          print("Collection 'geminidb' does not exist.")
 
-  db = create_chroma_db(documents, "geminidb")
+  cache = EmbeddingCache(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'embeddings.sqlite'))
+  embedding_function = GeminiEmbeddingFunction(cache=cache)
+  db = create_chroma_db(documents, "geminidb", embedding_function=embedding_function, path=persist_path)
 
-  passage = get_relevant_passage("safety", db)
+  passage = get_relevant_passage("safety", db, embedding_function=embedding_function)
   #print(passage)
 
   query = "what is safety evaluations for gemini?"
@@ -109,11 +155,16 @@ def main():
   #print(prompt)
 
   model = genai.GenerativeModel('gemini-pro')
-  answer = model.generate_content(prompt)
+  call = GeminiCall(deadline=60.0)
+  answer = call(model.generate_content, prompt)
   print(answer.text)
+  print(f"Embedding cache: {cache.stats()}")
+  print(f"Gemini calls: generate {call.stats()}, embed {embedding_function.call.stats()}, "
+        f"embed batches {embedding_function.batch_call.stats()}")
 
 if __name__ == "__main__":
-    main()
+    # pass a directory to keep the collection on disk and sync it incrementally, e.g. CHROMA_PATH=./chroma
+    main(persist_path=os.getenv("CHROMA_PATH"))
   
 
 
@@ -0,0 +1,73 @@
+# index_sync.py
+# - Incremental sync of a document collection against the current corpus
+# - Each stored document carries a content hash in its metadata
+
+import hashlib
+
+
+def content_hash(text):
+    """Return the sha256 hex digest of a document's text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def stored_hashes(collection):
+    """Return {id: content hash} for every document stored in the collection."""
+    result = collection.get(include=["metadatas"])
+    return {
+        doc_id: (metadata or {}).get("hash")
+        for doc_id, metadata in zip(result["ids"], result["metadatas"])
+    }
+
+
+class IndexSync:
+    """
+    Compares the corpus with what a persistent collection already holds.
+
+    Pass the corpus through changed() to get only new or modified documents,
+    then call delete_removed() to drop ids that are no longer in the corpus.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.known = stored_hashes(collection)
+        self.seen = set()
+        self.updated_ids = []
+        self.added = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.deleted = 0
+
+    def changed(self, items):
+        """Yield the (id, document[, metadata]) items that are new or whose content hash differs."""
+        for item in items:
+            doc_id, doc = item[0], item[1]
+            self.seen.add(doc_id)
+            old = self.known.get(doc_id)
+            if old == content_hash(doc):
+                self.unchanged += 1
+                continue
+            if old is None:
+                self.added += 1
+            else:
+                self.updated += 1
+                self.updated_ids.append(doc_id)
+            yield item
+
+    def removed(self):
+        """Return the stored ids that were not seen in the corpus."""
+        return [doc_id for doc_id in self.known if doc_id not in self.seen]
+
+    def delete_removed(self):
+        ids = self.removed()
+        if ids:
+            self.collection.delete(ids=ids)
+        self.deleted = len(ids)
+        return ids
+
+    def summary(self):
+        return {
+            "added": self.added,
+            "updated": self.updated,
+            "unchanged": self.unchanged,
+            "deleted": self.deleted,
+        }
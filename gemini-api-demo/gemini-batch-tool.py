@@ -0,0 +1,202 @@
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from google.api_core import exceptions
+
+from model_registry import call_stats, configure_calls, enable_response_cache, request_counts, response_cache_stats
+
+TOOL_DIR = os.path.dirname(os.path.abspath(__file__))
+
+EXPERT_SYSTEM_INSTRUCTION = """
+    You are an expert in a specific field. Your task is to provide precise, detailed, and well-informed answers based on the user input.
+    """
+
+# tool name -> (script, function taking (module, record) and returning text)
+TOOLS = {
+    "troubleshoot": ("gemini-troubleshoot-tool.py", lambda mod, record: mod.troubleshoot_error(record["input"])),
+    "code": ("gemini-code-generation-tool.py", lambda mod, record: mod.generate_code(record["input"])),
+    "expert": ("gemini-expert-tool.py", lambda mod, record: mod.get_expert_answer(
+        mod.create_expert_model(record.get("system_instruction", EXPERT_SYSTEM_INSTRUCTION)), record["input"])),
+    "evaluate": ("gemini-evaluation-tool.py", lambda mod, record: mod.evaluate_essay(record["input"])),
+}
+
+RETRYABLE = (exceptions.ResourceExhausted, exceptions.TooManyRequests, exceptions.ServiceUnavailable)
+
+
+def load_tool(name):
+    """Import a gemini-*-tool.py script as a module and return (module, call)."""
+    script, call = TOOLS[name]
+    spec = importlib.util.spec_from_file_location(script[:-3].replace('-', '_'), os.path.join(TOOL_DIR, script))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module, call
+
+
+def read_records(path, done, malformed=None):
+    """
+    Yield input records from a JSONL file, skipping ids already in done.
+
+    Lines that are not JSON, or objects without an "input", are skipped and
+    logged; their line numbers are appended to malformed when given.
+    """
+    with open(path) as f:
+        for n, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                record = None
+            else:
+                if not isinstance(record, dict):
+                    record = {"input": record}
+            if record is None or "input" not in record:
+                print(f"Skipping malformed line {n} of {path}", file=sys.stderr)
+                if malformed is not None:
+                    malformed.append(n)
+                continue
+            record.setdefault("id", str(n))
+            if str(record["id"]) not in done:
+                yield record
+
+
+def completed_ids(path):
+    """Return ids that already have an output in a previous (possibly interrupted) run."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path) as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # partial last line of an interrupted run
+            if "output" in result:
+                done.add(str(result["id"]))
+    return done
+
+
+class TokenBucket:
+    """Async token bucket allowing rate_per_minute acquisitions with bursts of up to capacity."""
+
+    def __init__(self, rate_per_minute, capacity=1):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+async def call_with_retry(bucket, func, record, max_retries=6, base_delay=1.0):
+    """Run func(record) in a worker thread, backing off exponentially on rate-limit errors."""
+    for attempt in range(max_retries + 1):
+        await bucket.acquire()
+        try:
+            return await asyncio.to_thread(func, record)
+        except RETRYABLE:
+            if attempt == max_retries:
+                raise
+            await asyncio.sleep(base_delay * 2 ** attempt + random.uniform(0, base_delay))
+
+
+async def run_batch(tool, input_path, output_path, concurrency=8, rpm=60, max_retries=6):
+    """
+    Run a tool over every record of a JSONL file, writing results to output JSONL in completion order.
+
+    Records whose id already has an output in output_path are skipped, so an interrupted run
+    can be resumed by running the same command again.
+
+    Args:
+        tool (str): One of TOOLS.
+        input_path (str): JSONL file with {"id": ..., "input": ...} records.
+        output_path (str): JSONL file results are appended to.
+        concurrency (int): Maximum number of requests in flight.
+        rpm (int): Maximum requests per minute.
+        max_retries (int): Retries per record on rate-limit errors.
+
+    Returns:
+        dict: Counts of succeeded, failed, skipped (already done) and malformed records and elapsed seconds.
+    """
+    module, call = load_tool(tool)
+    module.setup_api_key()
+    # one request per attempt: retries and backoff happen here, where every attempt takes a bucket token
+    configure_calls(deadline=120.0, retries=0, hedge=False)
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=concurrency))
+
+    done = completed_ids(output_path)
+    bucket = TokenBucket(rpm, capacity=concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    stats = {"succeeded": 0, "failed": 0, "skipped": len(done)}
+    malformed = []
+    start = time.perf_counter()
+
+    with open(output_path, "a") as out:
+        async def process(record):
+            try:
+                output = await call_with_retry(bucket, lambda r: call(module, r), record, max_retries)
+                result = {"id": record["id"], "output": output}
+                stats["succeeded"] += 1
+            except Exception as e:
+                result = {"id": record["id"], "error": f"{type(e).__name__}: {e}"}
+                stats["failed"] += 1
+            finally:
+                semaphore.release()
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+
+        tasks = set()
+        for record in read_records(input_path, done, malformed):
+            await semaphore.acquire()
+            task = asyncio.create_task(process(record))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+
+    stats["malformed"] = len(malformed)
+    stats["seconds"] = round(time.perf_counter() - start, 2)
+    stats["requests"] = request_counts()
+    stats["calls"] = call_stats()
+    if response_cache_stats() is not None:
+        stats["response_cache"] = response_cache_stats()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a gemini-api-demo tool over a JSONL file of inputs.")
+    parser.add_argument("tool", choices=sorted(TOOLS))
+    parser.add_argument("input", help="JSONL file with one {\"id\": ..., \"input\": ...} record per line")
+    parser.add_argument("output", help="JSONL file to append results to; rerun to resume")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rpm", type=int, default=60, help="requests per minute")
+    parser.add_argument("--max-retries", type=int, default=6)
+    parser.add_argument("--cache", help="SQLite file for caching temperature 0 responses")
+    parser.add_argument("--cache-ttl", type=float, default=7 * 24 * 3600, help="seconds")
+    args = parser.parse_args()
+
+    if args.cache:
+        enable_response_cache(args.cache, ttl=args.cache_ttl)
+
+    stats = asyncio.run(run_batch(args.tool, args.input, args.output,
+                                  concurrency=args.concurrency, rpm=args.rpm, max_retries=args.max_retries))
+    print(stats)
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,7 @@
 import google.generativeai as genai
 import os
 from dotenv import load_dotenv
+from model_registry import get_model
 
 def setup_api_key():
     """Set up the API key for the model."""
@@ -8,7 +9,7 @@ def setup_api_key():
     genai.configure(api_key=os.environ["GOOGLE_API_KEY"])
 
 def create_code_generation_model():
-    """Create and return a code generation model."""
+    """Return the shared code generation model."""
     code_generation_system_prompt = """
     You are a coding assistant. Your task is to generate a code snippet that accomplishes a specific goal.
     The code snippet must be concise, efficient, and well-commented for clarity.
@@ -16,7 +17,7 @@ def create_code_generation_model():
 
     If the task does not specify a programming language, default to Python.
     """
-    return genai.GenerativeModel(
+    return get_model(
         model_name='gemini-1.5-flash-latest',
         generation_config={"temperature": 0},
         system_instruction=code_generation_system_prompt
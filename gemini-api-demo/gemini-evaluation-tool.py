@@ -1,6 +1,7 @@
 import google.generativeai as genai
 import os
 from dotenv import load_dotenv
+from model_registry import get_model
 
 def setup_api_key():
     """Set up the API key for the model."""
@@ -12,7 +13,7 @@ def generate_student_essay(topic):
     The essay should have mistakes regarding clarity, grammar, argumentation, and vocabulary.
     Ensure your essay includes a clear thesis statement. You should write only an essay, so do not include any notes."""
 
-    student_model = genai.GenerativeModel(
+    student_model = get_model(
         model_name='gemini-1.5-flash-latest', 
         generation_config={"temperature": 1}, 
         system_instruction=student_system_prompt
@@ -34,7 +35,7 @@ def evaluate_essay(student_essay):
     2. Write a corrected version of the essay, addressing any identified issues
     in the original submission. Point what changes were made.
     """
-    teacher_model = genai.GenerativeModel(
+    teacher_model = get_model(
         model_name='gemini-1.5-flash-latest', 
         generation_config={"temperature": 0}, 
         system_instruction=teacher_system_prompt
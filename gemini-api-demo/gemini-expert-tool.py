@@ -1,6 +1,7 @@
 import google.generativeai as genai
 import os
 from dotenv import load_dotenv
+from model_registry import get_model
 
 def setup_api_key():
     """Set up the API key for the model."""
@@ -8,8 +9,8 @@ def setup_api_key():
     genai.configure(api_key=os.environ["GOOGLE_API_KEY"])
 
 def create_expert_model(system_instruction: str) -> genai.GenerativeModel:
-    """Create and return a Generative AI model configured with the provided system instruction."""
-    return genai.GenerativeModel(
+    """Return the shared Generative AI model configured with the provided system instruction."""
+    return get_model(
         model_name='gemini-1.5-flash-latest',
         generation_config={"temperature": 0},
         system_instruction=system_instruction
@@ -1,6 +1,7 @@
 import google.generativeai as genai
 import os
 from dotenv import load_dotenv
+from model_registry import get_model
 
 def setup_api_key():
     """Set up the API key for the model."""
@@ -8,11 +9,11 @@ def setup_api_key():
     genai.configure(api_key=os.environ["GOOGLE_API_KEY"])
 
 def create_error_handling_model():
-    """Create and return an error handling model."""
+    """Return the shared error handling model."""
     error_handling_system_prompt = """
     Your task is to explain exactly why this error occurred and how to fix it.
     """
-    return genai.GenerativeModel(
+    return get_model(
         model_name='gemini-1.5-flash-latest',
         generation_config={"temperature": 0},
         system_instruction=error_handling_system_prompt
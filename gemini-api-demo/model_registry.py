@@ -0,0 +1,114 @@
+# model_registry.py
+# - Shared registry of GenerativeModel objects for the gemini-api-demo tools
+# - Each (model_name, generation_config, system_instruction) is built once and reused across calls and threads
+# - Optional response cache for deterministic models (set GEMINI_RESPONSE_CACHE=<sqlite path> to enable)
+# - Every request goes through a shared GeminiCall (deadline, retries; see configure_calls)
+
+import hashlib
+import json
+import os
+import threading
+
+import google.generativeai as genai
+
+from gemini_call import GeminiCall  # copy of gemini-app/gemini_call.py, see tests/test_demo_helpers.py
+from response_cache import ResponseCache
+
+_lock = threading.Lock()
+_models = {}
+_response_cache = None
+_gemini_call = GeminiCall(deadline=120.0)
+
+
+def enable_response_cache(path="./cache/responses.sqlite", ttl=7 * 24 * 3600, max_entries=10000):
+    """Serve repeated prompts to temperature 0 models from an on-disk cache."""
+    global _response_cache
+    _response_cache = ResponseCache(path, ttl=ttl, max_entries=max_entries)
+    return _response_cache
+
+
+def response_cache_stats():
+    return _response_cache.stats() if _response_cache is not None else None
+
+
+def configure_calls(**kwargs):
+    """Replace the shared GeminiCall, e.g. configure_calls(retries=0) when the caller retries itself."""
+    global _gemini_call
+    _gemini_call = GeminiCall(**kwargs)
+    return _gemini_call
+
+
+def call_stats():
+    """Return retry, hedge and timeout counters of all requests sent through the registry."""
+    return _gemini_call.stats()
+
+
+class RegisteredModel:
+    """A shared GenerativeModel that counts the requests sent through it."""
+
+    def __init__(self, model, key):
+        self.model = model
+        self.key = key
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def _generate(self, *args, **kwargs):
+        with self._lock:
+            self.requests += 1
+        return _gemini_call(self.model.generate_content, *args, **kwargs)
+
+    def generate_content(self, *args, **kwargs):
+        if _response_cache is None or len(args) != 1 or kwargs:
+            return self._generate(*args, **kwargs)
+        name, config, instruction = self.key
+        return _response_cache.generate(name, json.loads(config), instruction, args[0], self._generate)
+
+    def __getattr__(self, name):
+        return getattr(self.model, name)
+
+
+def model_key(model_name, generation_config=None, system_instruction=None):
+    return (model_name, json.dumps(generation_config or {}, sort_keys=True), system_instruction)
+
+
+def get_model(model_name, generation_config=None, system_instruction=None):
+    """
+    Return the shared model for this configuration, creating it on first use.
+
+    Args:
+        model_name (str): Gemini model name.
+        generation_config (dict, optional): Generation settings such as temperature.
+        system_instruction (str, optional): System prompt for the model.
+
+    Returns:
+        RegisteredModel: Wraps genai.GenerativeModel and counts generate_content calls.
+    """
+    key = model_key(model_name, generation_config, system_instruction)
+    model = _models.get(key)
+    if model is None:
+        with _lock:
+            model = _models.get(key)
+            if model is None:
+                model = RegisteredModel(genai.GenerativeModel(
+                    model_name=model_name,
+                    generation_config=generation_config,
+                    system_instruction=system_instruction
+                ), key)
+                _models[key] = model
+    return model
+
+
+def request_counts():
+    """Return {model description: request count} for every registered model."""
+    with _lock:
+        models = list(_models.values())
+    counts = {}
+    for model in models:
+        name, config, instruction = model.key
+        digest = hashlib.sha1((instruction or '').encode("utf-8")).hexdigest()[:8]
+        counts[f"{name} {config} system_instruction={digest}"] = model.requests
+    return counts
+
+
+if os.getenv("GEMINI_RESPONSE_CACHE"):
+    enable_response_cache(os.getenv("GEMINI_RESPONSE_CACHE"))
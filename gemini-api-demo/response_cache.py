@@ -0,0 +1,115 @@
+# response_cache.py
+# - Opt-in on-disk cache of generate_content answers for deterministic (temperature 0) models
+# - SQLite file with TTL, size-based LRU eviction and hit-rate statistics
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+
+CachedResponse = namedtuple("CachedResponse", ["text"])
+
+
+def is_deterministic(generation_config):
+    """Only temperature 0 configs give repeatable answers worth caching."""
+    return (generation_config or {}).get("temperature") == 0
+
+
+def response_key(model_name, generation_config, system_instruction, prompt):
+    payload = json.dumps([model_name, generation_config or {}, system_instruction, prompt],
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Exact-match response cache keyed by model name, generation config, system instruction and prompt.
+
+    Args:
+        path (str): SQLite file to store responses in, created if missing.
+        ttl (float): Seconds a response stays valid. Defaults to 7 days.
+        max_entries (int): Size cap; least recently used entries are evicted beyond it.
+    """
+
+    def __init__(self, path="./cache/responses.sqlite", ttl=7 * 24 * 3600, max_entries=10000):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, text TEXT NOT NULL, created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses(last_used)")
+        self._conn.commit()
+
+    def get(self, key):
+        """Return the cached text for key, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT text, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl:
+                if row is not None:
+                    self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._conn.commit()
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, text):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, text, created, last_used) VALUES (?, ?, ?, ?)",
+                (key, text, now, now),
+            )
+            self._conn.execute("DELETE FROM responses WHERE created < ?", (now - self.ttl,))
+            excess = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+            if excess > 0:
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY last_used LIMIT ?)",
+                    (excess,),
+                )
+            self._conn.commit()
+
+    def generate(self, model_name, generation_config, system_instruction, prompt, generate):
+        """
+        Return a cached answer or call generate(prompt) and cache its text.
+
+        Non-deterministic configs and non-text prompts bypass the cache.
+        """
+        if not is_deterministic(generation_config) or not isinstance(prompt, str):
+            with self._lock:
+                self.bypassed += 1
+            return generate(prompt)
+        key = response_key(model_name, generation_config, system_instruction, prompt)
+        text = self.get(key)
+        if text is not None:
+            return CachedResponse(text)
+        response = generate(prompt)
+        self.put(key, response.text)
+        return response
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "bypassed": self.bypassed,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+        }
@@ -0,0 +1,93 @@
+# chat_log.py
+# - Append-only JSONL chat log written turn by turn
+# - Buffered writes, flush/fsync policy and size-based rotation
+
+import datetime
+import json
+import os
+import threading
+import time
+
+
+class ChatLog:
+    """
+    Writes one JSON line per chat message as it happens, so a crash loses at most the unflushed buffer.
+
+    Args:
+        logpath (str): Directory for log files, created if missing.
+        prefix (str): File name prefix; files are <prefix>-<timestamp>[.<n>].jsonl.
+        flush_every (int): Flush after this many buffered records.
+        flush_interval (float): Also flush, from a background timer, once the oldest buffered record
+            is this many seconds old, even if no further message arrives.
+        fsync (bool): fsync the file on every flush, not just hand it to the OS.
+        max_bytes (int): Rotate to a new file once the current one reaches this size.
+    """
+
+    def __init__(self, logpath="./log", prefix="chat-log", flush_every=1, flush_interval=5.0,
+                 fsync=True, max_bytes=10 * 1024 * 1024):
+        os.makedirs(logpath, exist_ok=True)
+        self.logpath = logpath
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.max_bytes = max_bytes
+        self.base = os.path.join(logpath, f"{prefix}-{datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')}")
+        self.part = 0
+        self.path = f"{self.base}.jsonl"
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._buffer = []
+        self._first_buffered = None
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._timer = None
+        if flush_every > 1 and flush_interval:
+            self._timer = threading.Thread(target=self._flush_on_timer, name="chat-log-flush", daemon=True)
+            self._timer.start()
+
+    def write(self, role, text, **fields):
+        """Buffer one message with a timestamp and any extra fields (turn number, latency, ...)."""
+        record = {"ts": datetime.datetime.now().isoformat(timespec="milliseconds"), "role": role, "text": text}
+        record.update(fields)
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            if not self._buffer:
+                self._first_buffered = time.monotonic()
+            self._buffer.append(line)
+            if (len(self._buffer) >= self.flush_every
+                    or time.monotonic() - self._first_buffered >= self.flush_interval):
+                self._flush()
+
+    def _flush_on_timer(self):
+        while not self._closed.wait(self.flush_interval / 2):
+            with self._lock:
+                if self._buffer and time.monotonic() - self._first_buffered >= self.flush_interval:
+                    self._flush()
+
+    def flush(self):
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if not self._buffer or self._file is None:
+            return
+        self._file.write("".join(self._buffer))
+        self._buffer = []
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        if self._file.tell() >= self.max_bytes:
+            self._rotate()
+
+    def _rotate(self):
+        self._file.close()
+        self.part += 1
+        self.path = f"{self.base}.{self.part}.jsonl"
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def close(self):
+        self._closed.set()
+        with self._lock:
+            self._flush()
+            if self._file is not None:
+                self._file.close()
+                self._file = None
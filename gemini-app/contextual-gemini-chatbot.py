@@ -7,9 +7,15 @@
 import google.generativeai as genai
 import os
 import datetime
+import time
+from collections import deque
 from dotenv import load_dotenv
 from os.path import expanduser
 
+from chat_log import ChatLog
+from context_packer import estimate_tokens
+from gemini_call import GeminiCall
+
 class GeminiChatbot:
     def __init__(self):
         # Load the .env file from the home directory
@@ -25,14 +31,91 @@ class GeminiChatbot:
 
         self.modelname = "gemini-1.5-flash"
         self.model = genai.GenerativeModel(self.modelname)
+        self.gemini_call = GeminiCall(deadline=60.0) # deadline and retries for generate_content, no hedged duplicates
         
-        self.chat_history = []
+        self.max_history = 200 # messages kept in memory in bounded mode; 'full' mode keeps the whole conversation
+        self.chat_history = deque()
+        self.logpath = './log'
+        self.chat_log = None
+        self.stream = True # print response chunks as they arrive
+
+        self.memory_mode = 'full' # 'full' sends the whole chat history, 'bounded' keeps it within token_budget
+        self.token_budget = 2000  # tokens of conversation memory per prompt in bounded mode
+        self.summary = ''         # running summary of turns that no longer fit the budget
+        self.turns = []           # recent (user, chatbot) turns kept verbatim in bounded mode
+        self.last_prompt_tokens = 0
+
+    def memory_text(self):
+        if self.memory_mode != 'bounded':
+            return ''.join(self.chat_history)
+        summary = f"Summary of earlier conversation: {self.summary}\n" if self.summary else ''
+        return summary + ''.join(f"You: {user}\nChatbot: {bot}\n" for user, bot in self.turns)
+
+    def build_prompt(self, prompt):
+        return "Please go through chat history below if user ask question regarding on previous conversation.\nPlease anwser question directly if it is not related to previous conversation\n" + "+++chat history\n" + self.memory_text() + "+++\n" + "new prompt: " + prompt
+
+    def over_budget(self):
+        return estimate_tokens(self.memory_text()) > self.token_budget
+
+    def remember(self, user_input, response):
+        """
+        Add a turn to bounded memory, folding the oldest turns into the running summary when over budget.
+
+        A new summary can itself be long, so the budget is checked again after each summary: more
+        turns are folded in while any remain, then the summary is condensed, and as a last resort cut.
+        """
+        if self.memory_mode != 'bounded':
+            return
+        self.turns.append((user_input, response))
+        while self.over_budget():
+            evicted = []
+            while len(self.turns) > 1 and self.over_budget():
+                evicted.append(self.turns.pop(0))
+            if not evicted:
+                break
+            self.summary = self.summarize(evicted)
+        if self.summary and self.over_budget():
+            self.summary = self.summarize([], words=self.token_budget // 16)
+        if self.summary and self.over_budget():
+            overhead = len(self.memory_text()) - len(self.summary)
+            self.summary = self.summary[:max(0, 4 * self.token_budget - 1 - overhead)]
+
+    def summarize(self, turns, words=None):
+        conversation = ''.join(f"You: {user}\nChatbot: {bot}\n" for user, bot in turns)
+        prompt = (f"Update the running summary of a conversation with the new turns below. "
+                  f"Keep names, facts and open questions; use at most {words or self.token_budget // 8} words.\n"
+                  f"Current summary: {self.summary or '(empty)'}\n"
+                  f"New turns:\n{conversation or '(none, only shorten the summary)'}\n"
+                  f"Updated summary:")
+        return self.gemini_call(self.model.generate_content, prompt).text.strip()
+
+    def record_usage(self, response, prompt):
+        usage = getattr(response, 'usage_metadata', None)
+        self.last_prompt_tokens = getattr(usage, 'prompt_token_count', 0) or estimate_tokens(prompt)
 
     def generate_response(self, prompt):
-        full_prompt = "Please go through chat history below if user ask question regarding on previous conversation.\nPlease anwser question directly if it is not related to previous conversation\n" + "+++chat history\n" + ''.join(self.chat_history) + "+++\n" + "new prompt: " + prompt
-        response = self.model.generate_content(full_prompt)
+        full_prompt = self.build_prompt(prompt)
+        response = self.gemini_call(self.model.generate_content, full_prompt)
+        self.record_usage(response, full_prompt)
         return response.text
 
+    def stream_response(self, prompt, label):
+        """Print response chunks as they arrive; return full text, time to first token and total latency."""
+        start = time.perf_counter()
+        ttft = None
+        parts = []
+        full_prompt = self.build_prompt(prompt)
+        print(label, end="", flush=True)
+        response = self.gemini_call(self.model.generate_content, full_prompt, stream=True)
+        for chunk in response:
+            if ttft is None:
+                ttft = time.perf_counter() - start
+            print(chunk.text, end="", flush=True)
+            parts.append(chunk.text)
+        print()
+        self.record_usage(response, full_prompt)
+        return ''.join(parts), ttft, time.perf_counter() - start
+
     def log_chat_history(self,logpath):
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
         log_filename = f"chat-log-{timestamp}.txt"
@@ -48,6 +131,10 @@ class GeminiChatbot:
     
     def chat(self):
         n=1 # input number
+        # 'full' mode sends the whole chat history as memory, so only bounded mode may drop old messages
+        maxlen = self.max_history if self.memory_mode == 'bounded' else None
+        self.chat_history = deque(self.chat_history, maxlen=maxlen)
+        self.chat_log = ChatLog(self.logpath)
         print("Welcome to GeminiChatbot! ('/q' to exit)\n")
         self.chat_history.append("Welcome to GeminiChatbot! ('/q' to exit)\n")
         while True:
@@ -55,14 +142,29 @@ class GeminiChatbot:
             self.chat_history.append(f"{n} You: {user_input}\n")
                       
             if user_input.lower() == "/q":
-                self.log_chat_history('./log')
+                self.chat_log.close()
+                print(f"chat log file: {self.chat_log.path}")
+                print(f"Gemini calls: {self.gemini_call.stats()}")
                 print("Chat history saved. Exiting.")
                 break
-            response = self.generate_response(user_input)
-            print(f"{n} Chatbot: {response}")
+            self.chat_log.write("user", user_input, turn=n)
+            ttft = None
+            if self.stream:
+                response, ttft, total = self.stream_response(user_input, f"{n} Chatbot: ")
+                print(f"(first token {ttft or total:.2f}s, total {total:.2f}s, prompt {self.last_prompt_tokens} tokens)")
+            else:
+                start = time.perf_counter()
+                response = self.generate_response(user_input)
+                total = time.perf_counter() - start
+                print(f"{n} Chatbot: {response}")
+                print(f"(total {total:.2f}s, prompt {self.last_prompt_tokens} tokens)")
             self.chat_history.append(f"{n} Chatbot: {response}")
+            self.chat_log.write("chatbot", response, turn=n, first_token_s=ttft, latency_s=round(total, 3),
+                                prompt_tokens=self.last_prompt_tokens)
+            self.remember(user_input, response)
             n += 1
 
 if __name__ == "__main__":
     chatbot = GeminiChatbot()
+    #chatbot.memory_mode = 'bounded'
     chatbot.chat()
\ No newline at end of file
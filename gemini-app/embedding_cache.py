@@ -0,0 +1,142 @@
+# embedding_cache.py
+# - Persistent, content-addressed cache for Gemini embeddings
+# - SQLite file with LRU eviction and hit/miss counters
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from array import array
+
+
+def embedding_key(model, task_type, title, text):
+    """Return the cache key for one text embedded with the given model settings."""
+    payload = json.dumps([model, task_type, title, text], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Disk-backed embedding cache keyed by sha256(model, task_type, title, text).
+
+    Args:
+        path (str): SQLite file to store embeddings in, created if missing.
+        max_entries (int): Size cap; least recently used entries are evicted beyond it.
+    """
+
+    def __init__(self, path="./cache/embeddings.sqlite", max_entries=200000):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, vector BLOB NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_lru ON embeddings(last_used)")
+        self._conn.commit()
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def get_many(self, keys):
+        """Return {key: embedding} for the keys present in the cache and mark them as recently used."""
+        found = {}
+        now = time.time()
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({marks})", chunk
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("d", blob).tolist()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                    [(now, key) for key, _ in rows],
+                )
+            self._conn.commit()
+        return found
+
+    def put_many(self, items):
+        """
+        Store (key, embedding) pairs and evict least recently used entries over the size cap.
+
+        The entry count is kept in memory (read once on open), so a write costs
+        primary-key lookups for its own keys instead of a full table count.
+        """
+        items = dict(items)
+        keys = list(items)
+        now = time.time()
+        with self._lock:
+            existing = 0
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                marks = ",".join("?" * len(chunk))
+                existing += self._conn.execute(
+                    f"SELECT COUNT(*) FROM embeddings WHERE key IN ({marks})", chunk
+                ).fetchone()[0]
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                [(key, array("d", vector).tobytes(), now) for key, vector in items.items()],
+            )
+            self._entries += len(keys) - existing
+            excess = self._entries - self.max_entries
+            if excess > 0:
+                deleted = self._conn.execute(
+                    "DELETE FROM embeddings WHERE rowid IN "
+                    "(SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (excess,),
+                ).rowcount
+                self._entries -= deleted
+            self._conn.commit()
+
+    def get_or_embed(self, model, task_type, title, texts, embed):
+        """
+        Return embeddings for texts, calling embed(missing_texts) only for cache misses.
+
+        Args:
+            model, task_type, title (str): Embedding settings that are part of the key.
+            texts (list): Texts to embed.
+            embed (callable): Takes a list of texts and returns a list of embeddings.
+
+        Returns:
+            list: One embedding per input text, in input order.
+        """
+        keys = [embedding_key(model, task_type, title, text) for text in texts]
+        found = self.get_many(list(set(keys)))
+
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        with self._lock:
+            self.hits += len(keys) - sum(1 for key in keys if key in missing)
+            self.misses += sum(1 for key in keys if key in missing)
+
+        if missing:
+            vectors = embed(list(missing.values()))
+            new = list(zip(missing.keys(), vectors))
+            self.put_many(new)
+            found.update(new)
+        return [found[key] for key in keys]
+
+    def stats(self):
+        """Return hit/miss counters and the current number of cached embeddings."""
+        with self._lock:
+            size = self._entries
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": size,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
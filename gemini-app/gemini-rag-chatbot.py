@@ -9,6 +9,10 @@ import chromadb
 import numpy as np
 import pandas as pd
 import datetime
+import time
+import threading
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
 
 import google.generativeai as genai
 
@@ -17,14 +21,55 @@ from chromadb import Documents, EmbeddingFunction, Embeddings
 import os
 
 from dotenv import load_dotenv
+from embedding_cache import EmbeddingCache
+from index_sync import IndexSync, content_hash
+from vector_index import NumpyVectorIndex
+from index_snapshot import SnapshotIndex, export_snapshot
+from semantic_cache import SemanticCache
+from query_batcher import QueryBatcher
+from rag_metrics import Metrics
+from context_packer import reciprocal_rank_fusion, select_context
+from ingest import iter_chunks
+from lexical_index import BM25Index
+from chat_log import ChatLog
+from gemini_call import GeminiCall
+
 class GeminiEmbeddingFunction(EmbeddingFunction):
+    def __init__(self, cache=None, call=None, batch_call=None):
+        self.model = 'models/embedding-001'
+        self.title = "Custom query"
+        self.task_type = "retrieval_document"
+        self.cache = cache
+        self.call = call or GeminiCall(deadline=30.0, hedge=True) # single-text embeds are idempotent and cheap, safe to hedge
+        self.batch_call = batch_call or GeminiCall(deadline=60.0) # multi-text requests (ingestion, batched queries), never hedged
+
+    def embed(self, texts):
+        call = self.call if len(texts) == 1 else self.batch_call
+        return call(genai.embed_content,
+                    model=self.model,
+                    content=texts,
+                    task_type=self.task_type,
+                    title=self.title)["embedding"]
+
     def __call__(self, input: Documents) -> Embeddings:
-        model = 'models/embedding-001'
-        title = "Custom query"
-        return genai.embed_content(model=model,
-                                   content=input,
-                                   task_type="retrieval_document",
-                                   title=title)["embedding"]
+        texts = [input] if isinstance(input, str) else list(input)
+        if self.cache is None:
+            return self.embed(texts)
+        return self.cache.get_or_embed(self.model, self.task_type, self.title, texts, self.embed)
+
+def make_batches(items, max_docs=100, max_chars=50000):
+    """Group (id, document[, metadata]) items into batches bounded by document count and total characters."""
+    batch, chars = [], 0
+    for item in items:
+        doc = item[1]
+        if batch and (len(batch) >= max_docs or chars + len(doc) > max_chars):
+            yield batch
+            batch, chars = [], 0
+        batch.append(item)
+        chars += len(doc)
+    if batch:
+        yield batch
+
 class RAGChatBot:
     def __init__(self):
         self.envpath = '~'
@@ -38,19 +83,65 @@ class RAGChatBot:
         genai.configure(api_key=os.getenv("GOOGLE_API_KEY"))
 
         self.dbname = 'geminidb'
+        self.persist_path = None # directory for a persistent collection, synced incrementally on start
+        self.backend = 'chroma'  # 'chroma', 'numpy' (in-process NumpyVectorIndex) or 'snapshot' (quantized SnapshotIndex)
+        self.index_path = './index'
+        self.snapshot_dtype = 'int8' # 'int8' or 'float16' codes in the snapshot file
+        self.snapshot_full_precision = False # also store float32 vectors to rescore the top-k (larger file)
         self.db = None
         self.documents = []
+        self.corpus_path = None  # directory of .txt/.md/.jsonl files, streamed in chunks instead of documents
+        self.chunk_chars = 1500
+        self.chunk_overlap = 200
         self.subject = ''
-        self.embedding_function = GeminiEmbeddingFunction()
+        self.cachepath = './cache'
+        self.embedding_cache = EmbeddingCache(os.path.join(self.cachepath, 'embeddings.sqlite'))
+        self.embedding_function = GeminiEmbeddingFunction(cache=self.embedding_cache)
+        self.query_batcher = None # QueryBatcher coalescing concurrent query embeddings, see enable_query_batching
         self.query = ''
+        self.query_embedding = None
         self.passage = ''
+        self.passage_id = None   # ids of the chunks packed into the passage
+        self.top_k = 8           # candidates retrieved per query
+        self.mmr_lambda = 0.5    # relevance vs. diversity when re-ranking candidates
+        self.context_tokens = 800 # token budget for the passage in the prompt
+        self.retrieval_mode = 'vector' # 'vector' or 'hybrid' (BM25 prefilter, fused with vector scores)
+        self.lexical_index = BM25Index()
+        self.retrieval_stats = Counter()
+        self._stats_lock = threading.Lock()
+        self.semantic_cache = SemanticCache(threshold=0.95, max_entries=1000) # None to always generate
         self.model_name = 'gemini-1.5-flash'
         self.model = genai.GenerativeModel(self.model_name)
-        self.chat_history = []
+        self.gemini_call = GeminiCall(deadline=60.0) # deadline and retries for generate_content, no hedged duplicates
+        self.max_history = 200 # messages kept in memory; the JSONL chat log keeps everything
+        self.chat_history = deque(maxlen=self.max_history)
+        self.logpath = './log'
+        self.chat_log = None
+        self.stream = True # print response chunks as they arrive
+        self.metrics = Metrics(enabled=True) # per-stage latency and size histograms
+        self.metrics_path = './log/rag-metrics.json' # dumped on exit; use a .prom name for Prometheus text
+
+        self.batch_size = 100    # max documents per embedding request
+        self.batch_chars = 50000 # max characters per embedding request
+        self.max_workers = 4     # parallel embedding requests
 
         self.chroma_client = chromadb.Client() 
 
     def create_chroma_db(self):
+        self.lexical_index.clear()
+        if self.backend == 'numpy':
+            self.db = NumpyVectorIndex(self.index_path, embedding_function=self.embedding_function)
+            self.sync_index()
+            self.db.save()
+            return self.db
+        if self.backend == 'snapshot':
+            return self.load_snapshot()
+
+        if self.persist_path:
+            self.chroma_client = chromadb.PersistentClient(path=self.persist_path)
+            self.db = self.chroma_client.get_or_create_collection(name=self.dbname, embedding_function=self.embedding_function)
+            return self.sync_index()
+
         collections = self.chroma_client.list_collections
         for collection_name in (collection.name for collection in collections()):
             if collection_name.strip() == self.dbname:
@@ -58,20 +149,190 @@ class RAGChatBot:
                 self.chroma_client.delete_collection(name=self.dbname)
         
         self.db = self.chroma_client.create_collection(name=self.dbname, embedding_function=self.embedding_function)
+        if self.semantic_cache is not None:
+            self.semantic_cache.clear()
         
-        for i, d in enumerate(self.documents):
-            self.db.add(
-              documents=d,
-              ids=str(i)
-            )
+        self.add_documents(self.iter_documents())
+        return self.db
+
+    def sync_index(self):
+        """Bring the persistent index in line with the corpus, embedding only new or changed documents."""
+        sync = IndexSync(self.db)
+        self.add_documents(sync.changed(self.iter_documents()), write=self.db.upsert)
+        removed = sync.delete_removed()
+        if self.semantic_cache is not None:
+            self.semantic_cache.invalidate(sync.updated_ids + removed)
+        print(f"Index sync: {sync.summary()}")
         return self.db
+
+    def load_snapshot(self):
+        """Open the quantized snapshot in index_path, rebuilding it only when the corpus has changed."""
+        path = os.path.join(self.index_path, 'snapshot.bin')
+        snapshot = None
+        if os.path.exists(path):
+            snapshot = self.db = SnapshotIndex(path, embedding_function=self.embedding_function)
+            sync = IndexSync(snapshot)
+            changed = sum(1 for _ in sync.changed(self.iter_documents()))
+            if not changed and not sync.removed():
+                print(f"Index sync: {sync.summary()}")
+                return self.db
+
+        # Rebuild in memory from the old snapshot's vectors plus the changed documents; re-quantizing
+        # dequantized codes gives back the same codes, so repeated rebuilds do not drift
+        self.lexical_index.clear()
+        self.db = NumpyVectorIndex(embedding_function=self.embedding_function)
+        if snapshot is not None and snapshot.count():
+            records = snapshot.get(include=["documents", "metadatas", "embeddings"])
+            self.db.add(ids=records["ids"], documents=records["documents"],
+                        embeddings=records["embeddings"], metadatas=records["metadatas"])
+            del records
+        snapshot = None
+        self.sync_index()
+        export_snapshot(self.db, path, dtype=self.snapshot_dtype, full_precision=self.snapshot_full_precision)
+        self.db = SnapshotIndex(path, embedding_function=self.embedding_function)
+        return self.db
+
+    def iter_documents(self):
+        """Yield (id, document[, metadata]) items for the corpus, adding each to the BM25 index in hybrid mode."""
+        for item in self.iter_corpus():
+            if self.retrieval_mode == 'hybrid':
+                self.lexical_index.add(item[0], item[1])
+            yield item
+
+    def iter_corpus(self):
+        """Yield corpus items, lazily when reading from corpus_path."""
+        if self.corpus_path:
+            yield from iter_chunks(self.corpus_path, self.chunk_chars, self.chunk_overlap)
+            return
+        for i, d in enumerate(self.documents):
+            yield str(i), d
+
+    def _embed_batch(self, batch):
+        ids = [item[0] for item in batch]
+        docs = [item[1] for item in batch]
+        metadatas = [dict(item[2]) if len(item) > 2 else {} for item in batch]
+        for metadata, doc in zip(metadatas, docs):
+            metadata["hash"] = content_hash(doc)
+        return ids, docs, metadatas, self.embedding_function(docs)
+
+    def add_documents(self, items, write=None):
+        """Embed (id, document[, metadata]) items in parallel batches and write each batch to the collection in bulk."""
+        write = write or self.db.add
+        start = time.perf_counter()
+        total = 0
+
+        def flush(futures):
+            nonlocal total
+            if not futures:
+                return
+            for future in futures:
+                ids, docs, metadatas, embeddings = future.result()
+                write(ids=ids, documents=docs, embeddings=embeddings, metadatas=metadatas)
+                total += len(ids)
+            elapsed = time.perf_counter() - start
+            print(f"\rIndexed {total} documents ({total / max(elapsed, 1e-9):.0f} docs/s)", end="", flush=True)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending = set()
+            for batch in make_batches(items, self.batch_size, self.batch_chars):
+                # keep a bounded number of batches in flight so memory stays flat
+                if len(pending) >= 2 * self.max_workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    flush(done)
+                pending.add(executor.submit(self._embed_batch, batch))
+            flush(pending)
+
+        elapsed = time.perf_counter() - start
+        if total:
+            print(f"\rIndexed {total} documents in {elapsed:.2f}s ({total / max(elapsed, 1e-9):.0f} docs/s)")
+        return total
    
+    def enable_query_batching(self, max_batch=32, max_wait=0.008, max_inflight=8):
+        """Embed queries arriving within max_wait seconds of each other with one batched call."""
+        self.query_batcher = QueryBatcher(self.embedding_function, max_batch=max_batch, max_wait=max_wait,
+                                          max_inflight=max_inflight, metrics=self.metrics)
+        return self.query_batcher
+
+    def embed_query(self, text):
+        embed = self.query_batcher or self.embedding_function
+        return embed([text])[0]
+
+    def retrieve(self, query):
+      """
+      Return (query embedding, passage ids, passage) for a query without touching per-conversation state.
+
+      The top_k nearest chunks are re-ranked with maximal marginal relevance and the best
+      non-redundant ones are packed into context_tokens. In hybrid mode a confident BM25 hit
+      is answered without embedding the query (the embedding is then None); otherwise BM25 and
+      vector rankings are fused before re-ranking.
+      """
+      hits = []
+      if self.retrieval_mode == 'hybrid':
+        with self.metrics.span('lexical'):
+          hits = self.lexical_index.search(query, self.top_k)
+        if self.lexical_index.confident(query, hits):
+          self.count_retrieval('lexical_only')
+          ids = [doc_id for doc_id, _ in hits]
+          with self.metrics.span('pack'):
+            ids, docs = select_context(None, ids, self.fetch_documents(ids), None, self.context_tokens)
+          return None, tuple(ids), " ... ".join(docs)
+
+      with self.metrics.span('embed'):
+        embedding = self.embed_query(query)
+      with self.metrics.span('search'):
+        result = self.db.query(query_embeddings=[embedding], n_results=self.top_k,
+                               include=['documents', 'embeddings'])
+      ids, docs, embeddings = list(result['ids'][0]), list(result['documents'][0]), list(result['embeddings'][0])
+
+      relevance = None
+      if hits:
+        self.count_retrieval('fused')
+        missing = [doc_id for doc_id, _ in hits if doc_id not in set(ids)]
+        if missing:
+          extra = self.db.get(ids=missing, include=['documents', 'embeddings'])
+          ids += extra['ids']
+          docs += extra['documents']
+          embeddings += list(extra['embeddings'])
+        fused = reciprocal_rank_fusion(result['ids'][0], [doc_id for doc_id, _ in hits])
+        best = max(fused.values())
+        relevance = [fused[doc_id] / best for doc_id in ids]
+      else:
+        self.count_retrieval('vector')
+
+      with self.metrics.span('pack'):
+        ids, docs = select_context(embedding, ids, docs, embeddings, self.context_tokens,
+                                   lambda_mult=self.mmr_lambda, relevance=relevance)
+      return embedding, tuple(ids), " ... ".join(docs)
+
+    def fetch_documents(self, ids):
+      result = self.db.get(ids=ids, include=['documents'])
+      by_id = dict(zip(result['ids'], result['documents']))
+      return [by_id[doc_id] for doc_id in ids]
+
+    def count_retrieval(self, kind):
+      with self._stats_lock:
+        self.retrieval_stats[kind] += 1
+
+    def retrieval_summary(self):
+      """Return retrieval counts by path and the fraction of queries that needed no embedding call."""
+      with self._stats_lock:
+        stats = dict(self.retrieval_stats)
+      queries = sum(stats.values())
+      stats['queries'] = queries
+      stats['network_avoided'] = stats.get('lexical_only', 0) / queries if queries else 0.0
+      return stats
+
+    def call_summary(self):
+      """Return retry, hedge and timeout counters of the generate, single-text embed and batched embed calls."""
+      return {'generate': self.gemini_call.stats(), 'embed': self.embedding_function.call.stats(),
+              'embed_batch': self.embedding_function.batch_call.stats()}
+
     def get_relevant_passage(self):
-      self.passage = self.db.query(query_texts=[self.query], n_results=1)['documents'][0][0]
+      self.query_embedding, self.passage_id, self.passage = self.retrieve(self.query)
       return self.passage
 
-    def make_prompt(self):
-      escaped = self.passage.replace("'", "").replace('"', "").replace("\n", " ")
+    def build_prompt(self, query, passage):
+      escaped = passage.replace("'", "").replace('"', "").replace("\n", " ")
       prompt = ("""You are a helpful and informative bot that answers questions using text from the reference passage included below.\
       Be sure to respond in a complete sentence, being comprehensive, including all relevant background information.\
       However, you are talking to a non-technical audience, so be sure to break down complicated concepts and\
@@ -80,10 +341,49 @@ class RAGChatBot:
       QUESTION: '{query}'
       PASSAGE: '{passage}'
       ANSWER:
-      """).format(query=self.query, passage=escaped)
+      """).format(query=query, passage=escaped)
 
       return prompt
-        
+
+    def make_prompt(self):
+      with self.metrics.span('prompt'):
+        return self.build_prompt(self.query, self.passage)
+
+    def record_generation(self, prompt, answer, response):
+      """Observe prompt and response sizes, in characters and in tokens when the response reports usage."""
+      if not self.metrics.enabled:
+        return
+      self.metrics.observe('prompt_chars', len(prompt))
+      self.metrics.observe('response_chars', len(answer))
+      usage = getattr(response, 'usage_metadata', None)
+      if usage is not None:
+        self.metrics.observe('prompt_tokens', usage.prompt_token_count)
+        self.metrics.observe('response_tokens', usage.candidates_token_count)
+
+    def answer(self, query):
+      """
+      Answer one query without using instance conversation state, so it can run concurrently.
+
+      Returns:
+          tuple: (answer text, True if served from the semantic cache)
+      """
+      with self.metrics.span('turn'):
+        embedding, passage_id, passage = self.retrieve(query)
+        if self.semantic_cache is not None and embedding is not None:
+          cached = self.semantic_cache.lookup(embedding, passage_id)
+          if cached is not None:
+            self.metrics.observe('semantic_cache_hits', 1)
+            return cached, True
+        with self.metrics.span('prompt'):
+          prompt = self.build_prompt(query, passage)
+        with self.metrics.span('generate'):
+          response = self.gemini_call(self.model.generate_content, prompt)
+          answer = response.text
+        self.record_generation(prompt, answer, response)
+        if self.semantic_cache is not None and embedding is not None:
+          self.semantic_cache.add(embedding, passage_id, answer)
+        return answer, False
+
     def log_chat_history(self,logpath):
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
         log_filename = f"chat-log-{timestamp}.txt"
@@ -97,11 +397,32 @@ class RAGChatBot:
         
         print(f"chat log file: {log_path}")
         
+    def stream_response(self, prompt, label):
+        """Print response chunks as they arrive; return full text, time to first token and total latency."""
+        start = time.perf_counter()
+        ttft = None
+        parts = []
+        print(label, end="", flush=True)
+        response = self.gemini_call(self.model.generate_content, prompt, stream=True)
+        for chunk in response:
+            if ttft is None:
+                ttft = time.perf_counter() - start
+                self.metrics.observe('first_token_seconds', ttft)
+            print(chunk.text, end="", flush=True)
+            parts.append(chunk.text)
+        print()
+        answer = ''.join(parts)
+        self.record_generation(prompt, answer, response)
+        return answer, ttft, time.perf_counter() - start
+
     def ragchat(self):
 
         self.db = self.create_chroma_db()
 
         n=1 # input number
+        self.chat_history = deque(self.chat_history, maxlen=self.max_history)
+        self.chat_log = ChatLog(self.logpath)
+        self.chat_log.write("system", f"subject: {self.subject}")
         print("Welcome to Gemini RAG Chatbot ! ('/q' to exit)")
         self.chat_history.append(f"Welcome to Gemini RAG Chatbot ! ('/q' to exit)")
         print(f"Based on doc set of subject: '{self.subject}'\n")
@@ -115,21 +436,75 @@ class RAGChatBot:
             self.chat_history.append(f"{n} You: {self.query}\n")
                 
             if self.query.lower() == "/q":
-                self.log_chat_history('./log')
+                self.chat_log.close()
+                print(f"chat log file: {self.chat_log.path}")
+                print(f"Embedding cache: {self.embedding_cache.stats()}")
+                if self.semantic_cache is not None:
+                    print(f"Semantic cache: {self.semantic_cache.stats()}")
+                if self.query_batcher is not None:
+                    print(f"Query batching: {self.query_batcher.metrics()}")
+                if self.retrieval_mode == 'hybrid':
+                    print(f"Retrieval: {self.retrieval_summary()}")
+                print(f"Gemini calls: {self.call_summary()}")
+                if self.metrics.enabled:
+                    os.makedirs(os.path.dirname(self.metrics_path) or '.', exist_ok=True)
+                    print(f"metrics file: {self.metrics.dump(self.metrics_path)}")
                 print("Chat history saved. Exiting.")
                 break
             
+            self.chat_log.write("user", self.query, turn=n)
+            turn_start = time.perf_counter()
             self.passage = self.get_relevant_passage()
 
+            cached = None
+            if self.semantic_cache is not None and self.query_embedding is not None:
+                cached = self.semantic_cache.lookup(self.query_embedding, self.passage_id)
+            if cached is not None:
+                answer = cached
+                print(f"{n} RAG Chatbot: {answer}")
+                print("(semantic cache hit)")
+                self.metrics.observe('semantic_cache_hits', 1)
+                self.metrics.observe('turn_seconds', time.perf_counter() - turn_start)
+                self.chat_history.append(f"{n} RAG Chatbot: {answer}")
+                self.chat_log.write("chatbot", answer, turn=n, passages=list(self.passage_id), cached=True,
+                                    latency_s=round(time.perf_counter() - turn_start, 3))
+                n += 1
+                continue
+
             prompt = self.make_prompt()
             print(f"prompt: {prompt}\n")
 
-            response = self.model.generate_content(prompt)
-            print(f"{n} RAG Chatbot: {response.text}")
-            self.chat_history.append(f"{n} RAG Chatbot: {response.text}")
+            ttft = None
+            if self.stream:
+                with self.metrics.span('generate'):
+                    answer, ttft, total = self.stream_response(prompt, f"{n} RAG Chatbot: ")
+                print(f"(first token {ttft or total:.2f}s, total {total:.2f}s)")
+            else:
+                start = time.perf_counter()
+                with self.metrics.span('generate'):
+                    response = self.gemini_call(self.model.generate_content, prompt)
+                    answer = response.text
+                self.record_generation(prompt, answer, response)
+                total = time.perf_counter() - start
+                print(f"{n} RAG Chatbot: {answer}")
+                print(f"(total {total:.2f}s)")
+            self.metrics.observe('turn_seconds', time.perf_counter() - turn_start)
+            self.chat_history.append(f"{n} RAG Chatbot: {answer}")
+            self.chat_log.write("chatbot", answer, turn=n, passages=list(self.passage_id), cached=False,
+                                first_token_s=ttft, latency_s=round(time.perf_counter() - turn_start, 3))
+            if self.semantic_cache is not None and self.query_embedding is not None:
+                self.semantic_cache.add(self.query_embedding, self.passage_id, answer)
             n += 1
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Gemini RAG Chatbot")
+    parser.add_argument("--serve", action="store_true", help="serve many sessions over local HTTP instead of the console")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--corpus", help="directory of .txt/.md/.jsonl files to index instead of the sample documents")
+    args = parser.parse_args()
+
     ragchatbot = RAGChatBot()
 
     #ragchatbot.model_name = "gemini-1.5-flash"
@@ -139,6 +514,22 @@ if __name__ == "__main__":
     DOCUMENT3 = "Gemini has the most comprehensive safety evaluations of any Google AI model to date, including for bias and toxicity. We’ve conducted novel research into potential risk areas like cyber-offense, persuasion and autonomy, and have applied Google Research’s best-in-class adversarial testing techniques to help identify critical safety issues in advance of Gemini’s deployment."
     ragchatbot.documents = [DOCUMENT1, DOCUMENT2, DOCUMENT3]
     ragchatbot.subject = 'Gemini intro'
+    if args.corpus:
+        ragchatbot.corpus_path = args.corpus
+        ragchatbot.subject = os.path.basename(os.path.abspath(args.corpus))
+    #ragchatbot.persist_path = './chroma'
+    #ragchatbot.backend = 'numpy'
+    #ragchatbot.backend = 'snapshot'
+    #ragchatbot.retrieval_mode = 'hybrid'
 
-    ragchatbot.ragchat()
+    if args.serve:
+        from rag_server import serve
+        ragchatbot.create_chroma_db()
+        ragchatbot.enable_query_batching()
+        serve(ragchatbot, host=args.host, port=args.port, max_history=ragchatbot.max_history)
+        if ragchatbot.metrics.enabled:
+            os.makedirs(os.path.dirname(ragchatbot.metrics_path) or '.', exist_ok=True)
+            print(f"metrics file: {ragchatbot.metrics.dump(ragchatbot.metrics_path)}")
+    else:
+        ragchatbot.ragchat()
 
@@ -0,0 +1,175 @@
+# gemini_call.py
+# - Deadline, retry and hedging wrapper for blocking Gemini API calls
+# - Used by the chatbots, the chroma demo and (through model_registry) the gemini-api-demo tools
+#
+#   call = GeminiCall(deadline=60.0)
+#   response = call(model.generate_content, prompt)
+#   embedding = GeminiCall(hedge=True)(genai.embed_content, model=..., content=[query])["embedding"]
+
+import random
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, FIRST_COMPLETED, wait
+
+from google.api_core import exceptions
+
+RETRYABLE = (
+    exceptions.ResourceExhausted,
+    exceptions.TooManyRequests,
+    exceptions.ServiceUnavailable,
+    exceptions.InternalServerError,
+    exceptions.DeadlineExceeded,
+    ConnectionError,
+)
+
+
+class GeminiTimeout(TimeoutError):
+    """A call or one of its attempts ran past its deadline."""
+
+
+class GeminiCall:
+    """
+    Runs blocking API calls with a per-call deadline, retries and optional hedging.
+
+    Each request runs on its own daemon thread. A retryable error (or an
+    attempt that runs past attempt_timeout) is retried after a full-jitter
+    exponential backoff while the overall deadline allows. With hedging on, a
+    duplicate request is sent when the first one is still running after the
+    recent p95 latency (hedge_delay until min_samples latencies are known) and
+    whichever answers first wins. Hedging doubles the cost of slow requests, so
+    it is off by default and meant for cheap idempotent calls of similar size,
+    such as single-query embed_content. Keep large batches on a separate
+    unhedged instance so they neither get duplicated nor skew the p95. A request abandoned at its deadline keeps running on its
+    thread until the underlying call returns, but does not block interpreter exit.
+
+    Args:
+        deadline (float): Seconds a call may take, including retries and backoff.
+        attempt_timeout (float, optional): Seconds a single attempt may take. Defaults to the deadline.
+        retries (int): Retries after the first attempt.
+        backoff (float): Base backoff in seconds, doubled per retry.
+        max_backoff (float): Upper bound of one backoff.
+        hedge (bool): Send hedged duplicates; can be overridden per call.
+        hedge_delay (float): Hedge delay in seconds until enough latencies are known.
+        hedge_quantile (float): Latency quantile used as the hedge delay.
+        min_samples (int): Latencies needed before the quantile is used.
+    """
+
+    def __init__(self, deadline=60.0, attempt_timeout=None, retries=3, backoff=0.5, max_backoff=8.0,
+                 hedge=False, hedge_delay=2.0, hedge_quantile=0.95, min_samples=20):
+        self.deadline = deadline
+        self.attempt_timeout = attempt_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge = hedge
+        self.hedge_delay = hedge_delay
+        self.hedge_quantile = hedge_quantile
+        self.min_samples = min_samples
+        self.counters = Counter()              # calls, retries, hedges, hedge_wins, timeouts, failures
+        self.latencies = deque(maxlen=1000)    # seconds of recent successful hedge-eligible requests
+        self._lock = threading.Lock()
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    @staticmethod
+    def _submit(func, args, kwargs):
+        """Start func on a daemon thread and return a Future for its result."""
+        future = Future()
+
+        def run():
+            future.set_running_or_notify_cancel()
+            try:
+                future.set_result(func(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, name="gemini-call", daemon=True).start()
+        return future
+
+    def hedge_after(self):
+        """Seconds to wait for the first request before sending a hedged duplicate."""
+        with self._lock:
+            if len(self.latencies) < self.min_samples:
+                return self.hedge_delay
+            ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(self.hedge_quantile * len(ordered)))]
+
+    def __call__(self, func, *args, hedge=None, **kwargs):
+        """
+        Call func(*args, **kwargs) under the deadline and retry policy.
+
+        Args:
+            func (callable): Blocking API call, e.g. model.generate_content.
+            hedge (bool, optional): Override the instance hedging setting, e.g. False for streams.
+
+        Returns:
+            The first successful result.
+
+        Raises:
+            GeminiTimeout: The deadline passed before any attempt succeeded.
+            Exception: A non-retryable error, or the last error once retries are used up.
+        """
+        self._count("calls")
+        hedge = self.hedge if hedge is None else hedge
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            try:
+                return self._attempt(func, args, kwargs, deadline, hedge)
+            except RETRYABLE + (GeminiTimeout,) as e:
+                remaining = deadline - time.monotonic()
+                delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+                if attempt >= self.retries or delay >= remaining:
+                    self._count("failures")
+                    if isinstance(e, GeminiTimeout) or remaining <= 0:
+                        raise GeminiTimeout(f"no response within the {self.deadline:.1f}s deadline") from e
+                    raise
+                self._count("retries")
+                time.sleep(delay)
+                attempt += 1
+            except Exception:
+                self._count("failures")
+                raise
+
+    def _attempt(self, func, args, kwargs, deadline, hedge):
+        start = time.monotonic()
+        if self.attempt_timeout is not None:
+            deadline = min(deadline, start + self.attempt_timeout)
+        hedge_at = start + self.hedge_after() if hedge else None
+        futures = [self._submit(func, args, kwargs)]
+        submitted = {futures[0]: start}
+        pending = set(futures)
+        error = None
+        while pending:
+            now = time.monotonic()
+            if now >= deadline:
+                self._count("timeouts")
+                raise GeminiTimeout(f"attempt ran past its deadline after {now - start:.2f}s")
+            timeout = deadline - now
+            if hedge_at is not None and len(futures) == 1:
+                timeout = min(timeout, max(0.0, hedge_at - now))
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if hedge:
+                        with self._lock:
+                            self.latencies.append(time.monotonic() - submitted[future])
+                    if future is not futures[0]:
+                        self._count("hedge_wins")
+                    return future.result()
+                error = future.exception()
+            if pending and hedge_at is not None and len(futures) == 1 and time.monotonic() >= hedge_at:
+                self._count("hedges")
+                futures.append(self._submit(func, args, kwargs))
+                submitted[futures[-1]] = time.monotonic()
+                pending.add(futures[-1])
+        raise error
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        hedge_after = self.hedge_after()
+        return {**counters, "hedge_after_s": round(hedge_after, 3)}
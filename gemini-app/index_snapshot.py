@@ -0,0 +1,238 @@
+# index_snapshot.py
+# - Single-file, read-only snapshot of a vector collection for fast cold start
+# - Embeddings stored as float16 or int8 with per-vector scales and memory-mapped on load
+# - Optionally stores float32 vectors too, to rescore the final top-k at full precision
+#
+#   Layout: magic | header length (uint64) | JSON header | 64-byte aligned sections
+#   Sections: ids, metadatas (JSON), doc_offsets (uint64), documents (UTF-8),
+#             codes (float16/int8), scales (float32), vectors (float32, optional)
+
+import json
+import os
+
+import numpy as np
+
+from vector_index import as_embedding_matrix, normalize_rows, top_k
+
+MAGIC = b"RAGSNAP1"
+ALIGN = 64
+CODE_DTYPES = {"float16": np.float16, "int8": np.int8}
+
+
+def _align(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def quantize(vectors, dtype="int8"):
+    """
+    Quantize normalized float32 rows.
+
+    Args:
+        vectors (np.ndarray): (n, dim) float32 matrix.
+        dtype (str): "int8" (symmetric, one scale per row) or "float16".
+
+    Returns:
+        tuple: (codes, scales) where codes * scales[:, None] approximates vectors.
+    """
+    if dtype == "float16":
+        return vectors.astype(np.float16), np.ones(len(vectors), dtype=np.float32)
+    if dtype != "int8":
+        raise ValueError(f"Unsupported snapshot dtype {dtype!r}, use 'int8' or 'float16'.")
+    scales = np.abs(vectors).max(axis=1, initial=0.0) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def export_snapshot(collection, path, dtype="int8", full_precision=False):
+    """
+    Write every document of a collection to a snapshot file.
+
+    Works with any collection whose get() can include embeddings
+    (NumpyVectorIndex, chromadb collections, SnapshotIndex).
+
+    Args:
+        collection: Source collection.
+        path (str): Snapshot file to write; replaced atomically.
+        dtype (str): Storage type of the quantized codes, "int8" or "float16".
+        full_precision (bool): Also store float32 vectors for rescoring the final top-k.
+            Off by default, since they make the file larger than an unquantized index.
+
+    Returns:
+        str: The snapshot path.
+    """
+    records = collection.get(include=["documents", "metadatas", "embeddings"])
+    ids = list(records["ids"])
+    documents = list(records["documents"])
+    embeddings = records["embeddings"]
+    vectors = (normalize_rows(as_embedding_matrix(embeddings, rows=len(ids))) if ids
+               else np.zeros((0, 0), dtype=np.float32))
+    codes, scales = quantize(vectors, dtype)
+
+    encoded = [doc.encode("utf-8") for doc in documents]
+    doc_offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+    np.cumsum([len(doc) for doc in encoded], out=doc_offsets[1:])
+    sections = [
+        ("ids", json.dumps(ids).encode("utf-8")),
+        ("metadatas", json.dumps(list(records["metadatas"])).encode("utf-8")),
+        ("doc_offsets", doc_offsets.tobytes()),
+        ("documents", b"".join(encoded)),
+        ("codes", np.ascontiguousarray(codes).tobytes()),
+        ("scales", scales.tobytes()),
+    ]
+    if full_precision:
+        sections.append(("vectors", np.ascontiguousarray(vectors, dtype=np.float32).tobytes()))
+
+    layout, offset = {}, 0
+    for name, data in sections:
+        layout[name] = [offset, len(data)]
+        offset = _align(offset + len(data))
+    header = json.dumps({
+        "version": 1,
+        "count": len(ids),
+        "dim": int(vectors.shape[1]),
+        "dtype": dtype,
+        "sections": layout,
+    }).encode("utf-8")
+    data_start = _align(len(MAGIC) + 8 + len(header))
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(np.uint64(len(header)).tobytes())
+        f.write(header)
+        for name, data in sections:
+            f.seek(data_start + layout[name][0])
+            f.write(data)
+        f.truncate(data_start + offset)
+    os.replace(tmp, path)
+    return path
+
+
+class SnapshotIndex:
+    """
+    Read-only collection over a snapshot file written by export_snapshot().
+
+    Opening reads the header, ids and metadata; codes, full-precision vectors
+    and document text stay memory-mapped and are paged in only when touched.
+    A query scores the quantized codes block by block through one reused
+    float32 buffer of block_rows x dim, so scoring memory does not grow with
+    the corpus. When the snapshot holds float32 vectors, n_results * rescore
+    candidates are kept and reordered with them.
+
+    Args:
+        path (str): Snapshot file.
+        embedding_function (callable, optional): Used to embed query_texts.
+        rescore (int): Candidate multiplier for full-precision rescoring.
+        block_rows (int): Rows converted to float32 at a time while scoring.
+    """
+
+    def __init__(self, path, embedding_function=None, rescore=4, block_rows=4096):
+        self.path = path
+        self.embedding_function = embedding_function
+        self.rescore = rescore
+        self.block_rows = block_rows
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not an index snapshot.")
+            header_len = int(np.frombuffer(f.read(8), dtype=np.uint64)[0])
+            self.header = json.loads(f.read(header_len))
+        self._data_start = _align(len(MAGIC) + 8 + header_len)
+        self.dtype = self.header["dtype"]
+        n, dim = self.header["count"], self.header["dim"]
+
+        self.ids = json.loads(self._section("ids", np.uint8).tobytes())
+        self.metadatas = json.loads(self._section("metadatas", np.uint8).tobytes())
+        self._doc_offsets = self._section("doc_offsets", np.uint64)
+        self._documents = self._section("documents", np.uint8)
+        self.codes = self._section("codes", CODE_DTYPES[self.dtype], (n, dim))
+        self.scales = self._section("scales", np.float32)
+        self.vectors = self._section("vectors", np.float32, (n, dim)) if "vectors" in self.header["sections"] else None
+        self._pos = None
+
+    def _section(self, name, dtype, shape=None):
+        offset, length = self.header["sections"][name]
+        if length == 0:
+            return np.zeros(shape or (0,), dtype=dtype)
+        array = np.memmap(self.path, dtype=dtype, mode="r", offset=self._data_start + offset,
+                          shape=length // np.dtype(dtype).itemsize)
+        return array.reshape(shape) if shape else array
+
+    def count(self):
+        return len(self.ids)
+
+    def document(self, row):
+        start, end = int(self._doc_offsets[row]), int(self._doc_offsets[row + 1])
+        return self._documents[start:end].tobytes().decode("utf-8")
+
+    def embeddings(self, rows):
+        """Float32 embeddings of rows: stored vectors when present, dequantized codes otherwise."""
+        rows = np.asarray(rows, dtype=np.int64)
+        if self.vectors is not None:
+            return np.asarray(self.vectors[rows])
+        return self.codes[rows].astype(np.float32) * self.scales[rows, None]
+
+    def approximate_scores(self, queries):
+        """Cosine scores of normalized queries against the quantized codes, block by block."""
+        scores = np.empty((len(queries), self.count()), dtype=np.float32)
+        buffer = np.empty((min(self.block_rows, self.count()), self.header["dim"]), dtype=np.float32)
+        for start in range(0, self.count(), self.block_rows):
+            codes = self.codes[start:start + self.block_rows]
+            block = buffer[:len(codes)]
+            np.copyto(block, codes, casting="unsafe")
+            end = start + len(codes)
+            np.multiply(queries @ block.T, self.scales[start:end], out=scores[:, start:end])
+        return scores
+
+    def get(self, ids=None, include=("metadatas", "documents")):
+        if ids is None:
+            rows = list(range(self.count()))
+        else:
+            if self._pos is None:
+                self._pos = {doc_id: row for row, doc_id in enumerate(self.ids)}
+            rows = [self._pos[i] for i in ids if i in self._pos]
+        result = {"ids": [self.ids[row] for row in rows]}
+        if "documents" in include:
+            result["documents"] = [self.document(row) for row in rows]
+        if "metadatas" in include:
+            result["metadatas"] = [self.metadatas[row] for row in rows]
+        if "embeddings" in include:
+            result["embeddings"] = self.embeddings(rows)
+        return result
+
+    def query(self, query_texts=None, query_embeddings=None, n_results=10,
+              include=("documents", "metadatas", "distances")):
+        """
+        Return the n_results nearest documents for each query, chromadb style.
+
+        Args:
+            query_texts (list, optional): Texts to embed with the index's embedding function.
+            query_embeddings (list or np.ndarray, optional): Precomputed query embeddings.
+            n_results (int): Number of neighbours per query.
+            include (tuple): Any of "documents", "metadatas", "distances", "embeddings".
+
+        Returns:
+            dict: Lists with one inner list per query; distances are cosine distances (1 - similarity).
+        """
+        if query_embeddings is None:
+            query_embeddings = self.embedding_function(query_texts)
+        if not self.ids:
+            return {key: [[] for _ in range(len(query_embeddings))] for key in ("ids",) + tuple(include)}
+        queries = normalize_rows(np.asarray(query_embeddings, dtype=np.float32).reshape(-1, self.header["dim"]))
+        candidates, scores = top_k(self.approximate_scores(queries), max(n_results, n_results * self.rescore))
+        if self.vectors is not None:
+            scores = np.stack([self.embeddings(rows) @ query for rows, query in zip(candidates, queries)])
+        idx, scores = top_k(scores, n_results)
+        idx = np.take_along_axis(candidates, idx, axis=1)
+
+        result = {"ids": [[self.ids[row] for row in rows] for rows in idx]}
+        if "documents" in include:
+            result["documents"] = [[self.document(row) for row in rows] for rows in idx]
+        if "metadatas" in include:
+            result["metadatas"] = [[self.metadatas[row] for row in rows] for rows in idx]
+        if "distances" in include:
+            result["distances"] = (1.0 - scores).tolist()
+        if "embeddings" in include:
+            result["embeddings"] = [self.embeddings(rows) for rows in idx]
+        return result
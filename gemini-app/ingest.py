@@ -0,0 +1,120 @@
+# ingest.py
+# - Streaming corpus ingestion for the RAG chatbot
+# - Walks a directory of .txt/.md/.jsonl files and lazily yields overlapping, size-bounded chunks
+#   with stable ids and source metadata
+
+import json
+import os
+from collections import namedtuple
+
+Chunk = namedtuple("Chunk", ["id", "text", "metadata"])
+
+TEXT_EXTENSIONS = (".txt", ".md", ".markdown")
+JSONL_EXTENSIONS = (".jsonl",)
+
+
+def iter_files(root, extensions=TEXT_EXTENSIONS + JSONL_EXTENSIONS):
+    """Yield matching file paths under root in a stable (sorted) order."""
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+        for filename in sorted(filenames):
+            if filename.lower().endswith(extensions):
+                yield os.path.join(dirpath, filename)
+
+
+def split_stream(read, chunk_chars=1500, overlap=200):
+    """
+    Split text read incrementally from read(n) into overlapping chunks.
+
+    Chunks end at a paragraph break or whitespace in their second half when
+    possible. Only about one chunk of text is held in memory at a time.
+
+    Yields:
+        tuple: (character offset, chunk text)
+    """
+    if not 0 <= overlap < chunk_chars // 2:
+        raise ValueError("overlap must be smaller than half of chunk_chars")
+    buf, offset, eof = "", 0, False
+    while True:
+        while not eof and len(buf) <= chunk_chars:
+            data = read(chunk_chars)
+            if data:
+                buf += data
+            else:
+                eof = True
+        if len(buf) <= chunk_chars:
+            if buf.strip():
+                yield offset, buf
+            return
+        end = buf.rfind("\n\n", chunk_chars // 2, chunk_chars)
+        if end < 0:
+            end = buf.rfind(" ", chunk_chars // 2, chunk_chars)
+        if end < 0:
+            end = chunk_chars
+        if buf[:end].strip():
+            yield offset, buf[:end]
+        step = end - overlap
+        buf = buf[step:]
+        offset += step
+
+
+def split_text(text, chunk_chars=1500, overlap=200):
+    pos = 0
+
+    def read(n):
+        nonlocal pos
+        pos += n
+        return text[pos - n:pos]
+
+    return split_stream(read, chunk_chars, overlap)
+
+
+def _iter_jsonl_chunks(f, source, chunk_chars, overlap, text_field):
+    seen, skipped = set(), 0
+    for line_no, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            skipped += 1
+            continue
+        if not isinstance(record, dict) or not isinstance(record.get(text_field, ""), str):
+            skipped += 1
+            continue
+        record_id = str(record.get("id", line_no))
+        if record_id in seen:
+            record_id = f"{record_id}@{line_no}"
+        seen.add(record_id)
+        text = record.get(text_field) or ""
+        for n, (start, piece) in enumerate(split_text(text, chunk_chars, overlap)):
+            yield Chunk(f"{source}:{record_id}#{n}", piece,
+                        {"source": source, "record": record_id, "offset": start})
+    if skipped:
+        print(f"Skipped {skipped} malformed JSONL lines in {source}")
+
+
+def iter_chunks(root, chunk_chars=1500, overlap=200, text_field="text"):
+    """
+    Lazily yield Chunk(id, text, metadata) for every file under root.
+
+    Ids are "<relative path>#<chunk number>" for text files and
+    "<relative path>:<record id>#<chunk number>" for JSONL records, so they stay
+    stable across runs while the files are unchanged. JSONL lines that are not
+    JSON objects with a text field are skipped and reported; a repeated record
+    id gets its line number appended so chunk ids stay unique.
+
+    Args:
+        root (str): Corpus directory.
+        chunk_chars (int): Maximum characters per chunk.
+        overlap (int): Characters shared by consecutive chunks.
+        text_field (str): Field holding the text in JSONL records.
+    """
+    for path in iter_files(root):
+        source = os.path.relpath(path, root).replace(os.sep, "/")
+        with open(path, encoding="utf-8", errors="replace") as f:
+            if path.lower().endswith(JSONL_EXTENSIONS):
+                yield from _iter_jsonl_chunks(f, source, chunk_chars, overlap, text_field)
+            else:
+                for n, (start, piece) in enumerate(split_stream(f.read, chunk_chars, overlap)):
+                    yield Chunk(f"{source}#{n}", piece, {"source": source, "offset": start})
@@ -0,0 +1,117 @@
+# lexical_index.py
+# - In-memory BM25 inverted index for the hybrid retrieval mode of the RAG chatbot
+# - Updated incrementally per document; answers confident keyword queries without an embedding call
+
+import math
+import re
+import threading
+from collections import Counter
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i in is it me of on or the this to what when where which who why with you".split()
+)
+
+
+def tokenize(text):
+    return [token for token in TOKEN_RE.findall(text.lower()) if token not in STOPWORDS]
+
+
+class BM25Index:
+    """
+    BM25 inverted index over document ids.
+
+    Args:
+        k1 (float): Term frequency saturation.
+        b (float): Document length normalization.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}   # term -> {doc_id: term frequency}
+        self.doc_len = {}    # doc_id -> number of tokens
+        self.doc_terms = {}  # doc_id -> distinct terms, for removal
+        self.total_len = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.doc_len)
+
+    def add(self, doc_id, text):
+        """Index a document, replacing any previous version with the same id."""
+        counts = Counter(tokenize(text))
+        with self._lock:
+            self._remove(doc_id)
+            for term, tf in counts.items():
+                self.postings.setdefault(term, {})[doc_id] = tf
+            self.doc_terms[doc_id] = tuple(counts)
+            self.doc_len[doc_id] = sum(counts.values())
+            self.total_len += self.doc_len[doc_id]
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._remove(doc_id)
+
+    def _remove(self, doc_id):
+        for term in self.doc_terms.pop(doc_id, ()):
+            docs = self.postings[term]
+            del docs[doc_id]
+            if not docs:
+                del self.postings[term]
+        self.total_len -= self.doc_len.pop(doc_id, 0)
+
+    def clear(self):
+        with self._lock:
+            self.postings.clear()
+            self.doc_len.clear()
+            self.doc_terms.clear()
+            self.total_len = 0
+
+    def search(self, query, k=10):
+        """Return up to k (doc_id, score) pairs, best first."""
+        terms = set(tokenize(query))
+        with self._lock:
+            n = len(self.doc_len)
+            if not n or not terms:
+                return []
+            avg_len = self.total_len / n
+            scores = Counter()
+            for term in terms:
+                docs = self.postings.get(term)
+                if not docs:
+                    continue
+                idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+                for doc_id, tf in docs.items():
+                    norm = tf + self.k1 * (1 - self.b + self.b * self.doc_len[doc_id] / avg_len)
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / norm
+        return scores.most_common(k)
+
+    def max_score(self, query):
+        """Upper bound of a BM25 score for the query: every matching term at full saturation (k1 + 1)."""
+        terms = set(tokenize(query))
+        with self._lock:
+            n = len(self.doc_len)
+            return sum(math.log(1 + (n - len(self.postings[term]) + 0.5) / (len(self.postings[term]) + 0.5))
+                       for term in terms if term in self.postings) * (self.k1 + 1)
+
+    def confident(self, query, hits, min_score=0.5, margin=1.2, coverage=1.0):
+        """
+        Decide whether the lexical hits are good enough to skip vector search.
+
+        Scores are normalized by max_score(query), so the thresholds do not depend on
+        the number of query terms or the corpus size. The best hit needs a normalized
+        score of at least min_score, must beat the runner-up by the margin factor and
+        must contain at least `coverage` of the query terms.
+        """
+        if not hits:
+            return False
+        ceiling = self.max_score(query)
+        if not ceiling or hits[0][1] / ceiling < min_score:
+            return False
+        if len(hits) > 1 and hits[0][1] < margin * hits[1][1]:
+            return False
+        terms = set(tokenize(query))
+        with self._lock:
+            found = sum(1 for term in terms if hits[0][0] in self.postings.get(term, {}))
+        return found >= coverage * len(terms)
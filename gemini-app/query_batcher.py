@@ -0,0 +1,116 @@
+# query_batcher.py
+# - Coalesces concurrent query embeddings into batched embed calls
+# - Callers block on their own result while a worker thread collects one batch per window
+#   and hands it to a pool, so several batches can be in flight at once
+
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+
+class QueryBatcher:
+    """
+    Request-coalescing front for an embedding function.
+
+    Texts arriving within max_wait seconds of the first queued text (or until
+    max_batch texts are queued) are embedded with a single call and each
+    caller gets back its own embeddings. Up to max_inflight batches are sent
+    concurrently, so a new batch does not wait for the previous round trip.
+    Usable anywhere an embedding function is expected.
+
+    Args:
+        embed (callable): Takes a list of texts and returns a list of embeddings.
+        max_batch (int): Maximum texts per embedding call.
+        max_wait (float): Seconds to wait for more texts after the first one arrives.
+        max_inflight (int): Maximum embedding calls in flight.
+        metrics (Metrics, optional): Also records 'query_batch_size' and 'query_batch_wait_seconds' here.
+    """
+
+    def __init__(self, embed, max_batch=32, max_wait=0.008, max_inflight=8, metrics=None):
+        self.embed = embed
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.metrics_sink = metrics
+        self.batch_sizes = Counter()           # batch size -> number of calls
+        self.wait_times = deque(maxlen=10000)  # seconds each text waited before its batch was sent
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._stats_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_inflight)
+        self._executor = ThreadPoolExecutor(max_workers=max_inflight, thread_name_prefix="query-batch")
+        self._worker = threading.Thread(target=self._run, name="query-batcher", daemon=True)
+        self._worker.start()
+
+    def __call__(self, input):
+        texts = [input] if isinstance(input, str) else list(input)
+        futures = [self.submit(text) for text in texts]
+        return [future.result() for future in futures]
+
+    def submit(self, text):
+        """Queue one text and return a Future for its embedding."""
+        future = Future()
+        with self._cond:
+            self._queue.append((text, future, time.perf_counter()))
+            self._cond.notify()
+        return future
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+            deadline = self._queue[0][2] + self.max_wait
+            while len(self._queue) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            return [self._queue.popleft() for _ in range(min(self.max_batch, len(self._queue)))]
+
+    def _run(self):
+        while True:
+            self._slots.acquire()  # wait for a free slot before collecting, so waiting texts keep batching
+            batch = self._next_batch()
+            sent = time.perf_counter()
+            waits = [sent - queued for _, _, queued in batch]
+            with self._stats_lock:
+                self.batch_sizes[len(batch)] += 1
+                self.wait_times.extend(waits)
+            if self.metrics_sink is not None:
+                self.metrics_sink.observe('query_batch_size', len(batch))
+                for wait in waits:
+                    self.metrics_sink.observe('query_batch_wait_seconds', wait)
+            self._executor.submit(self._send, batch)
+
+    def _send(self, batch):
+        try:
+            embeddings = list(self.embed([text for text, _, _ in batch]))
+            if len(embeddings) != len(batch):
+                raise ValueError(f"Embedding function returned {len(embeddings)} embeddings for {len(batch)} texts.")
+            for (_, future, _), embedding in zip(batch, embeddings):
+                future.set_result(embedding)
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self._slots.release()
+
+    def metrics(self):
+        """Return the batch-size distribution and wait-time percentiles in milliseconds."""
+        with self._stats_lock:
+            batch_sizes = Counter(self.batch_sizes)
+            waits = sorted(self.wait_times)
+
+        def percentile(p):
+            return round(1000 * waits[min(len(waits) - 1, int(p * len(waits)))], 3) if waits else 0.0
+
+        calls = sum(batch_sizes.values())
+        texts = sum(size * count for size, count in batch_sizes.items())
+        return {
+            "calls": calls,
+            "texts": texts,
+            "mean_batch_size": texts / calls if calls else 0.0,
+            "batch_sizes": dict(sorted(batch_sizes.items())),
+            "wait_ms": {"p50": percentile(0.50), "p95": percentile(0.95), "p99": percentile(0.99)},
+        }
@@ -0,0 +1,114 @@
+# rag_metrics.py
+# - In-process latency and size histograms for the RAG pipeline
+# - Timing spans per stage, p50/p95/p99, JSON or Prometheus text export
+
+import json
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+
+_NULL_SPAN = nullcontext()
+
+
+class Histogram:
+    """Keeps count and sum of all observations and a window of recent samples for percentiles."""
+
+    def __init__(self, max_samples=10000):
+        self.count = 0
+        self.sum = 0.0
+        self.samples = deque(maxlen=max_samples)
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        self.samples.append(value)
+
+    def summary(self):
+        ordered = sorted(self.samples)
+
+        def percentile(p):
+            return ordered[min(len(ordered) - 1, int(p * len(ordered)))] if ordered else 0.0
+
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": percentile(0.50),
+            "p95": percentile(0.95),
+            "p99": percentile(0.99),
+        }
+
+
+class _Span:
+    __slots__ = ("metrics", "name", "start")
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Metrics:
+    """
+    Named histograms fed by timing spans and size observations.
+
+    When disabled, span() returns a shared no-op context manager and observe()
+    returns immediately, so instrumented code pays almost nothing.
+
+    Args:
+        enabled (bool): Collect observations.
+        max_samples (int): Recent samples kept per histogram for percentiles.
+    """
+
+    def __init__(self, enabled=True, max_samples=10000):
+        self.enabled = enabled
+        self.max_samples = max_samples
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def span(self, stage):
+        """Time a block of code into the '<stage>_seconds' histogram."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, f"{stage}_seconds")
+
+    def observe(self, name, value):
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram(self.max_samples)
+            histogram.observe(value)
+
+    def snapshot(self):
+        with self._lock:
+            return {name: histogram.summary() for name, histogram in sorted(self.histograms.items())}
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self, prefix="rag"):
+        """Render histograms as Prometheus summaries."""
+        lines = []
+        for name, summary in self.snapshot().items():
+            metric = f"{prefix}_{name}"
+            lines.append(f"# TYPE {metric} summary")
+            for quantile in ("p50", "p95", "p99"):
+                lines.append(f'{metric}{{quantile="0.{quantile[1:]}"}} {summary[quantile]}')
+            lines.append(f"{metric}_sum {summary['sum']}")
+            lines.append(f"{metric}_count {summary['count']}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path):
+        """Write metrics to path, as Prometheus text for a .prom file and JSON otherwise."""
+        with open(path, "w") as f:
+            f.write(self.to_prometheus() if path.endswith(".prom") else self.to_json())
+        return path
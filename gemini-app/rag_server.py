@@ -0,0 +1,166 @@
+# rag_server.py
+# - Multi-session asyncio HTTP front end for RAGChatBot
+# - One loaded index and model shared by all sessions; per-session state with idle expiry
+#
+#   POST /chat   {"session": "<optional id>", "query": "..."} -> {"session", "answer", "cached", "seconds"}
+#   GET  /health -> {"sessions": n, "retrieval": {...}, "calls": {...}, "batching": {...}}
+#   GET  /metrics -> Prometheus text (/metrics?format=json for JSON)
+
+import asyncio
+import json
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+
+class Session:
+    """Conversation state for one client, keeping the last max_history messages."""
+
+    def __init__(self, session_id, max_history=200):
+        self.id = session_id
+        self.history = deque(maxlen=max_history)
+        self.last_seen = time.monotonic()
+        self.lock = asyncio.Lock()  # keeps turns of one session in order
+
+
+class SessionStore:
+    """Sessions by id, dropped after idle_timeout seconds without a request."""
+
+    def __init__(self, idle_timeout=1800, max_history=200):
+        self.idle_timeout = idle_timeout
+        self.max_history = max_history
+        self.sessions = {}
+
+    def get(self, session_id=None):
+        session = self.sessions.get(session_id) if session_id else None
+        if session is None:
+            session = Session(session_id or uuid.uuid4().hex, self.max_history)
+            self.sessions[session.id] = session
+        session.last_seen = time.monotonic()
+        return session
+
+    def expire(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        idle = [sid for sid, session in self.sessions.items() if session.last_seen < cutoff]
+        for sid in idle:
+            del self.sessions[sid]
+        return len(idle)
+
+
+class RAGServer:
+    """
+    Serves bot.answer() to many concurrent sessions.
+
+    Blocking embedding, search and generation calls run on a thread pool, so
+    concurrent sessions do not wait on each other's network calls.
+
+    Args:
+        bot (RAGChatBot): Bot with its collection already created.
+        host (str): Interface to listen on.
+        port (int): TCP port.
+        idle_timeout (float): Seconds before an idle session is dropped.
+        max_workers (int): Maximum concurrent blocking calls.
+        max_history (int): Messages kept per session; older ones are dropped.
+    """
+
+    def __init__(self, bot, host="127.0.0.1", port=8080, idle_timeout=1800, max_workers=32, max_history=200):
+        self.bot = bot
+        self.host = host
+        self.port = port
+        self.sessions = SessionStore(idle_timeout, max_history)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    async def chat(self, payload):
+        if not isinstance(payload, dict):
+            return 400, {"error": "body must be a JSON object"}
+        query, session_id = payload.get("query"), payload.get("session")
+        if not isinstance(query, str) or not query.strip():
+            return 400, {"error": "query is required and must be a string"}
+        if session_id is not None and not isinstance(session_id, str):
+            return 400, {"error": "session must be a string"}
+        query = query.strip()
+        session = self.sessions.get(session_id)
+        async with session.lock:
+            start = time.perf_counter()
+            loop = asyncio.get_running_loop()
+            answer, cached = await loop.run_in_executor(self.executor, self.bot.answer, query)
+            session.history.append(f"You: {query}\n")
+            session.history.append(f"RAG Chatbot: {answer}")
+        return 200, {
+            "session": session.id,
+            "answer": answer,
+            "cached": cached,
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+
+    async def route(self, method, path, body):
+        if method == "POST" and path == "/chat":
+            try:
+                payload = json.loads(body or b"{}")
+            except json.JSONDecodeError:
+                return 400, {"error": "body must be JSON"}
+            return await self.chat(payload)
+        if method == "GET" and path == "/health":
+            health = {"sessions": len(self.sessions.sessions), "retrieval": self.bot.retrieval_summary(),
+                      "calls": self.bot.call_summary()}
+            if self.bot.query_batcher is not None:
+                health["batching"] = self.bot.query_batcher.metrics()
+            return 200, health
+        if method == "GET" and path.startswith("/metrics"):
+            if path.endswith("format=json"):
+                return 200, self.bot.metrics.snapshot()
+            return 200, self.bot.metrics.to_prometheus()
+        return 404, {"error": f"no route for {method} {path}"}
+
+    async def handle(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").split()
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1").strip()
+                if not line:
+                    break
+                name, _, value = line.partition(":")
+                headers[name.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length", 0)))
+            if len(request_line) < 2:
+                status, result = 400, {"error": "bad request"}
+            else:
+                status, result = await self.route(request_line[0], request_line[1], body)
+        except Exception as e:
+            status, result = 500, {"error": f"{type(e).__name__}: {e}"}
+
+        if isinstance(result, str):
+            data, content_type = result.encode("utf-8"), "text/plain; version=0.0.4"
+        else:
+            data, content_type = json.dumps(result, ensure_ascii=False).encode("utf-8"), "application/json"
+        writer.write(f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                     f"Content-Type: {content_type}\r\nContent-Length: {len(data)}\r\n"
+                     f"Connection: close\r\n\r\n".encode("latin-1") + data)
+        await writer.drain()
+        writer.close()
+
+    async def expire_sessions(self, interval=60):
+        while True:
+            await asyncio.sleep(interval)
+            self.sessions.expire()
+
+    async def serve(self):
+        server = await asyncio.start_server(self.handle, self.host, self.port)
+        expiry = asyncio.create_task(self.expire_sessions())
+        print(f"Gemini RAG Chatbot serving on http://{self.host}:{self.port} (POST /chat)")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            expiry.cancel()
+            self.executor.shutdown(wait=False)
+
+
+def serve(bot, host="127.0.0.1", port=8080, idle_timeout=1800, max_workers=32, max_history=200):
+    """Run the server until interrupted."""
+    try:
+        asyncio.run(RAGServer(bot, host, port, idle_timeout, max_workers, max_history).serve())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,106 @@
+# semantic_cache.py
+# - Semantic answer cache for the RAG chatbot
+# - Reuses an answer when a new query is close enough to a cached one and retrieves the same passage
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class SemanticCache:
+    """
+    Bounded LRU cache of (query embedding, retrieved document ids, answer).
+
+    doc_ids may be a single id or a sequence of ids when the prompt context
+    is packed from several chunks; a hit needs the same ids.
+
+    Args:
+        threshold (float): Minimum cosine similarity between queries for a hit.
+        max_entries (int): Size cap; least recently used answers are evicted beyond it.
+    """
+
+    def __init__(self, threshold=0.95, max_entries=1000):
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (unit query embedding, doc ids, answer)
+        self._by_passage = {}          # doc ids -> set of keys
+        self._by_doc = {}              # single doc id -> set of keys, for invalidation
+        self._next_key = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _ids(doc_ids):
+        return (doc_ids,) if isinstance(doc_ids, str) else tuple(doc_ids)
+
+    @staticmethod
+    def _unit(embedding):
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, embedding, doc_ids):
+        """Return a cached answer for a similar query that retrieved the same documents, or None."""
+        query = self._unit(embedding)
+        with self._lock:
+            keys = list(self._by_passage.get(self._ids(doc_ids), ()))
+            if keys:
+                scores = np.stack([self._entries[key][0] for key in keys]) @ query
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    self._entries.move_to_end(keys[best])
+                    self.hits += 1
+                    return self._entries[keys[best]][2]
+            self.misses += 1
+            return None
+
+    def add(self, embedding, doc_ids, answer):
+        doc_ids = self._ids(doc_ids)
+        with self._lock:
+            key = self._next_key
+            self._next_key += 1
+            self._entries[key] = (self._unit(embedding), doc_ids, answer)
+            self._by_passage.setdefault(doc_ids, set()).add(key)
+            for doc_id in doc_ids:
+                self._by_doc.setdefault(doc_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                old, _ = next(iter(self._entries.items()))
+                self._remove(old)
+
+    @staticmethod
+    def _discard(index, name, key):
+        keys = index.get(name)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del index[name]
+
+    def _remove(self, key):
+        _, doc_ids, _ = self._entries.pop(key)
+        self._discard(self._by_passage, doc_ids, key)
+        for doc_id in doc_ids:
+            self._discard(self._by_doc, doc_id, key)
+
+    def invalidate(self, doc_ids):
+        """Drop cached answers that were based on any of the given documents."""
+        with self._lock:
+            for doc_id in doc_ids:
+                for key in list(self._by_doc.get(doc_id, ())):
+                    self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_passage.clear()
+            self._by_doc.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
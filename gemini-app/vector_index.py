@@ -0,0 +1,217 @@
+# vector_index.py
+# - In-process vector index backed by a NumPy float32 matrix
+# - Drop-in for the chromadb collection calls used by the RAG chatbots
+#   (add/upsert/delete/get/query/count)
+
+import json
+import os
+
+import numpy as np
+
+
+def as_embedding_matrix(embeddings, rows=None, dim=None):
+    """
+    Validate embeddings and convert them once into a 2-D float32 array.
+
+    Args:
+        embeddings (list or np.ndarray): One embedding per document.
+        rows (int, optional): Expected number of embeddings.
+        dim (int, optional): Expected embedding dimension.
+
+    Returns:
+        np.ndarray: C-contiguous (rows, dim) float32 array.
+
+    Raises:
+        ValueError: On ragged or non-numeric input, wrong shape, or NaN/inf values.
+    """
+    try:
+        matrix = np.asarray(embeddings)
+    except ValueError as e:
+        raise ValueError(f"Embeddings must all have the same dimension: {e}") from e
+    if matrix.ndim != 2:
+        raise ValueError(f"Embeddings must be a 2-D list of lists of numbers, got {matrix.ndim}-D.")
+    if not (np.issubdtype(matrix.dtype, np.floating) or np.issubdtype(matrix.dtype, np.integer)):
+        raise ValueError(f"Embedding elements must be numerical, got dtype {matrix.dtype}.")
+    if rows is not None and matrix.shape[0] != rows:
+        raise ValueError(f"Expected {rows} embeddings, got {matrix.shape[0]}.")
+    if dim is not None and matrix.shape[1] != dim:
+        raise ValueError(f"Expected embedding dimension {dim}, got {matrix.shape[1]}.")
+    matrix = np.ascontiguousarray(matrix, dtype=np.float32)
+    if not np.isfinite(matrix).all():
+        raise ValueError("Embeddings contain NaN or infinite values.")
+    return matrix
+
+
+def normalize_rows(matrix):
+    """Scale each row to unit length; all-zero rows are left as zeros."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k(scores, k):
+    """Return (indices, scores) of the k best columns for every row of a 2-D score matrix, best first."""
+    k = min(k, scores.shape[1])
+    if k < scores.shape[1]:
+        idx = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        idx = np.broadcast_to(np.arange(scores.shape[1]), scores.shape).copy()
+    part = np.take_along_axis(scores, idx, axis=1)
+    order = np.argsort(-part, axis=1, kind="stable")
+    return np.take_along_axis(idx, order, axis=1), np.take_along_axis(part, order, axis=1)
+
+
+class NumpyVectorIndex:
+    """
+    Vector index keeping pre-normalized embeddings in one contiguous float32 matrix.
+
+    A query is a single matrix product against the normalized rows followed by
+    argpartition, so cosine top-k for a batch of queries costs one BLAS call.
+    Saved indexes are memory-mapped on load.
+
+    Args:
+        path (str, optional): Directory to load from and save to. Defaults to None (memory only).
+        embedding_function (callable, optional): Used to embed query_texts and documents added without embeddings.
+    """
+
+    def __init__(self, path=None, embedding_function=None):
+        self.path = path
+        self.embedding_function = embedding_function
+        self.ids = []
+        self.documents = []
+        self.metadatas = []
+        self._pos = {}
+        self._matrix = None
+        self._pending = []
+        if path and os.path.exists(os.path.join(path, "records.json")):
+            self.load()
+
+    @property
+    def matrix(self):
+        """The normalized (n, dim) float32 embedding matrix."""
+        if self._pending:
+            blocks = [self._matrix] if self._matrix is not None else []
+            self._matrix = np.ascontiguousarray(np.vstack(blocks + self._pending), dtype=np.float32)
+            self._pending = []
+        if self._matrix is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        return self._matrix
+
+    def count(self):
+        return len(self.ids)
+
+    def _embed(self, documents, embeddings):
+        if embeddings is None:
+            embeddings = self.embedding_function(documents)
+        dim = self._matrix.shape[1] if self._matrix is not None and self._matrix.size else None
+        return normalize_rows(as_embedding_matrix(embeddings, rows=len(documents), dim=dim))
+
+    def add(self, ids, documents, embeddings=None, metadatas=None):
+        """Append new documents; ids must not exist yet."""
+        duplicates = [doc_id for doc_id in ids if doc_id in self._pos]
+        if duplicates:
+            raise ValueError(f"Ids already exist in index: {duplicates[:5]}")
+        vectors = self._embed(documents, embeddings)
+        metadatas = metadatas or [None] * len(ids)
+        for doc_id, doc, metadata in zip(ids, documents, metadatas):
+            self._pos[doc_id] = len(self.ids)
+            self.ids.append(doc_id)
+            self.documents.append(doc)
+            self.metadatas.append(metadata)
+        self._pending.append(vectors)
+
+    def upsert(self, ids, documents, embeddings=None, metadatas=None):
+        """Add new documents and replace existing ones with the same id."""
+        vectors = self._embed(documents, embeddings)
+        metadatas = metadatas or [None] * len(ids)
+        new = [i for i, doc_id in enumerate(ids) if doc_id not in self._pos]
+        old = [i for i, doc_id in enumerate(ids) if doc_id in self._pos]
+        if old:
+            matrix = self.matrix
+            if not matrix.flags.writeable:
+                matrix = self._matrix = np.array(matrix)
+            for i in old:
+                row = self._pos[ids[i]]
+                matrix[row] = vectors[i]
+                self.documents[row] = documents[i]
+                self.metadatas[row] = metadatas[i]
+        if new:
+            self.add([ids[i] for i in new], [documents[i] for i in new],
+                     embeddings=vectors[new], metadatas=[metadatas[i] for i in new])
+
+    def delete(self, ids):
+        drop = {self._pos[doc_id] for doc_id in ids if doc_id in self._pos}
+        if not drop:
+            return
+        keep = [row for row in range(len(self.ids)) if row not in drop]
+        self._matrix = np.ascontiguousarray(self.matrix[keep])
+        self.ids = [self.ids[row] for row in keep]
+        self.documents = [self.documents[row] for row in keep]
+        self.metadatas = [self.metadatas[row] for row in keep]
+        self._pos = {doc_id: row for row, doc_id in enumerate(self.ids)}
+
+    def get(self, ids=None, include=("metadatas", "documents")):
+        rows = range(len(self.ids)) if ids is None else [self._pos[i] for i in ids if i in self._pos]
+        result = {"ids": [self.ids[row] for row in rows]}
+        if "documents" in include:
+            result["documents"] = [self.documents[row] for row in rows]
+        if "metadatas" in include:
+            result["metadatas"] = [self.metadatas[row] for row in rows]
+        if "embeddings" in include:
+            result["embeddings"] = self.matrix[list(rows)]
+        return result
+
+    def query(self, query_texts=None, query_embeddings=None, n_results=10,
+              include=("documents", "metadatas", "distances")):
+        """
+        Return the n_results nearest documents for each query, chromadb style.
+
+        Args:
+            query_texts (list, optional): Texts to embed with the index's embedding function.
+            query_embeddings (list or np.ndarray, optional): Precomputed query embeddings.
+            n_results (int): Number of neighbours per query.
+            include (tuple): Any of "documents", "metadatas", "distances", "embeddings".
+
+        Returns:
+            dict: Lists with one inner list per query; distances are cosine distances (1 - similarity).
+        """
+        if query_embeddings is None:
+            query_embeddings = self.embedding_function(query_texts)
+        if not self.ids:
+            return {key: [[] for _ in range(len(query_embeddings))] for key in ("ids",) + tuple(include)}
+        queries = normalize_rows(np.asarray(query_embeddings, dtype=np.float32).reshape(-1, self.matrix.shape[1]))
+        idx, scores = top_k(queries @ self.matrix.T, n_results)
+
+        result = {"ids": [[self.ids[row] for row in rows] for rows in idx]}
+        if "documents" in include:
+            result["documents"] = [[self.documents[row] for row in rows] for rows in idx]
+        if "metadatas" in include:
+            result["metadatas"] = [[self.metadatas[row] for row in rows] for rows in idx]
+        if "distances" in include:
+            result["distances"] = (1.0 - scores).tolist()
+        if "embeddings" in include:
+            result["embeddings"] = [self.matrix[rows] for rows in idx]
+        return result
+
+    def save(self, path=None):
+        """Write the matrix as embeddings.npy and ids, documents and metadata as records.json."""
+        path = path or self.path
+        os.makedirs(path, exist_ok=True)
+        tmp = os.path.join(path, "embeddings.tmp.npy")
+        np.save(tmp, self.matrix)
+        os.replace(tmp, os.path.join(path, "embeddings.npy"))
+        with open(os.path.join(path, "records.json.tmp"), "w") as f:
+            json.dump({"ids": self.ids, "documents": self.documents, "metadatas": self.metadatas}, f)
+        os.replace(os.path.join(path, "records.json.tmp"), os.path.join(path, "records.json"))
+
+    def load(self, path=None):
+        """Load records and memory-map the embedding matrix read-only."""
+        path = path or self.path
+        with open(os.path.join(path, "records.json")) as f:
+            records = json.load(f)
+        self.ids = records["ids"]
+        self.documents = records["documents"]
+        self.metadatas = records["metadatas"]
+        self._pos = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        self._matrix = np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r")
+        self._pending = []
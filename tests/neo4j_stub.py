@@ -0,0 +1,90 @@
+# neo4j_stub.py
+# - Stand-in for neo4j.Driver used to test and time neo4j-api-demo/neo4j_bulk_loader.py without a server
+# - Records every batch, sleeps a configurable write latency and tracks concurrent sessions
+
+import threading
+import time
+from types import SimpleNamespace
+
+
+class StubResult:
+    def __init__(self, query, rows):
+        self.query = query
+        self.rows = rows
+
+    def consume(self):
+        nodes = len(self.rows) if "MERGE (n:" in self.query else 0
+        relationships = len(self.rows) if "]->(b)" in self.query else 0
+        properties = sum(len(row) for row in self.rows) if nodes else 0
+        return SimpleNamespace(counters=SimpleNamespace(
+            nodes_created=nodes, relationships_created=relationships, properties_set=properties))
+
+
+class StubTransaction:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def run(self, query, rows):
+        time.sleep(self.driver.latency)
+        with self.driver.lock:
+            self.driver.batches.append((query, list(rows)))
+        return StubResult(query, rows)
+
+
+class StubSession:
+    def __init__(self, driver, database):
+        self.driver = driver
+        self.database = database
+
+    def __enter__(self):
+        with self.driver.lock:
+            self.driver.active += 1
+            self.driver.max_active = max(self.driver.max_active, self.driver.active)
+        return self
+
+    def __exit__(self, *exc):
+        with self.driver.lock:
+            self.driver.active -= 1
+        return False
+
+    def execute_write(self, work, *args):
+        return work(StubTransaction(self.driver), *args)
+
+
+class StubDriver:
+    """Enough of neo4j.Driver for BulkLoader: session(), execute_write() and execute_query()."""
+
+    def __init__(self, latency=0.002):
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.batches = []
+        self.queries = []
+        self.active = 0
+        self.max_active = 0
+
+    def session(self, database=None):
+        return StubSession(self, database)
+
+    def execute_query(self, query, database_=None):
+        self.queries.append(query)
+
+
+class CountingRows:
+    """Row iterator recording how far the loader has read ahead of the rows already written."""
+
+    def __init__(self, rows, driver):
+        self.rows = iter(rows)
+        self.driver = driver
+        self.read = 0
+        self.max_ahead = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        row = next(self.rows)
+        self.read += 1
+        with self.driver.lock:
+            written = sum(len(rows) for _, rows in self.driver.batches)
+        self.max_ahead = max(self.max_ahead, self.read - written)
+        return row
@@ -0,0 +1,28 @@
+# test_demo_helpers.py
+# - The demo folders carry copies of the gemini-app helper modules so each demo runs on its own;
+#   this keeps the copies identical to the originals
+
+import os
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+COPIES = [
+    ("chroma-api-demo", "gemini_call.py"),
+    ("chroma-api-demo", "embedding_cache.py"),
+    ("chroma-api-demo", "index_sync.py"),
+    ("chroma-api-demo", "context_packer.py"),
+    ("chroma-api-demo", "vector_index.py"),
+    ("gemini-api-demo", "gemini_call.py"),
+]
+
+
+def read(*parts):
+    with open(os.path.join(ROOT, *parts), encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("folder,name", COPIES)
+def test_copy_matches_gemini_app(folder, name):
+    assert read(folder, name) == read("gemini-app", name), \
+        f"{folder}/{name} differs from gemini-app/{name}; copy the updated module over"
@@ -0,0 +1,59 @@
+# test_neo4j_bulk_loader.py
+# - Batching, the in-flight bound, the parallel worker path and the reported stats of BulkLoader,
+#   checked against a stub driver (no Neo4j server needed)
+
+import pytest
+
+pytest.importorskip("neo4j")
+
+from neo4j_bulk_loader import BulkLoader, quote
+from neo4j_stub import CountingRows, StubDriver
+
+ROWS = 4000
+BATCH_SIZE = 250
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_load_nodes(workers):
+    driver = StubDriver(latency=0.002)
+    loader = BulkLoader(driver=driver, batch_size=BATCH_SIZE, workers=workers)
+    loader.create_index("Person", "name")
+    source = CountingRows(({"name": f"person-{i}", "age": i % 90} for i in range(ROWS)), driver)
+    stats = loader.load_nodes("Person", source, key="name")
+
+    sizes = [len(batch) for _, batch in driver.batches]
+    assert "IF NOT EXISTS" in driver.queries[0]
+    assert all(query.startswith("UNWIND $rows AS row MERGE") for query, _ in driver.batches)
+    assert sum(sizes) == stats["rows"] == ROWS
+    assert stats["batches"] == len(sizes) == -(-ROWS // BATCH_SIZE)
+    assert sorted(sizes, reverse=True)[:-1] == [BATCH_SIZE] * (len(sizes) - 1), "only one batch may be short"
+    assert len({row["name"] for _, batch in driver.batches for row in batch}) == ROWS
+    assert stats["nodes_created"] == ROWS
+    assert stats["properties_set"] == 2 * ROWS
+    assert driver.max_active <= workers
+    assert source.max_ahead <= (2 * workers + 1) * BATCH_SIZE
+    if workers > 1:
+        assert driver.max_active > 1, "parallel workers never overlapped"
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_load_relationships(workers):
+    driver = StubDriver(latency=0.0)
+    loader = BulkLoader(driver=driver, batch_size=BATCH_SIZE, workers=workers)
+    knows = ({"start": f"person-{i}", "end": f"person-{i + 1}"} for i in range(ROWS))
+    stats = loader.load_relationships("KNOWS", knows, "Person", "Person", "name", "name")
+
+    assert all("MERGE (a)-[r:`KNOWS`]->(b)" in query for query, _ in driver.batches)
+    assert stats["rows"] == stats["relationships_created"] == ROWS
+
+
+def test_load_nothing():
+    driver = StubDriver()
+    stats = BulkLoader(driver=driver, workers=2).load_nodes("Person", [])
+    assert stats["rows"] == 0
+    assert stats["batches"] == 0
+    assert not driver.batches
+
+
+def test_quote_escapes_backticks():
+    assert quote("Per`son") == "`Per``son`"
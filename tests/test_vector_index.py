@@ -0,0 +1,58 @@
+# test_vector_index.py
+# - NumpyVectorIndex must return the same neighbours as a chromadb collection holding the same vectors
+
+import chromadb
+import numpy as np
+import pytest
+
+from vector_index import NumpyVectorIndex
+
+
+@pytest.fixture
+def corpus():
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(300, 32)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    ids = [f"doc-{i}" for i in range(len(vectors))]
+    documents = [f"document {i}" for i in range(len(vectors))]
+    queries = rng.normal(size=(25, 32)).astype(np.float32)
+    return ids, documents, vectors, queries
+
+
+def test_query_matches_chroma(corpus):
+    ids, documents, vectors, queries = corpus
+    collection = chromadb.EphemeralClient().create_collection(
+        name="parity", embedding_function=None, metadata={"hnsw:space": "cosine"})
+    collection.add(ids=ids, documents=documents, embeddings=vectors)
+    index = NumpyVectorIndex()
+    index.add(ids=ids, documents=documents, embeddings=vectors)
+
+    expected = collection.query(query_embeddings=queries, n_results=5, include=["documents", "distances"])
+    result = index.query(query_embeddings=queries, n_results=5, include=["documents", "distances"])
+
+    assert result["ids"] == expected["ids"]
+    assert result["documents"] == expected["documents"]
+    np.testing.assert_allclose(result["distances"], expected["distances"], atol=1e-4)
+
+
+def test_upsert_and_delete_match_chroma(corpus):
+    ids, documents, vectors, queries = corpus
+    replaced = np.roll(vectors[:10], 1, axis=1)
+    collection = chromadb.EphemeralClient().create_collection(
+        name="parity-updates", embedding_function=None, metadata={"hnsw:space": "cosine"})
+    index = NumpyVectorIndex()
+    for db in (collection, index):
+        db.add(ids=ids, documents=documents, embeddings=vectors)
+        db.upsert(ids=ids[:10], documents=documents[:10], embeddings=replaced)
+        db.delete(ids=ids[10:20])
+
+    assert index.count() == collection.count()
+    assert (index.query(query_embeddings=queries, n_results=5)["ids"]
+            == collection.query(query_embeddings=queries, n_results=5)["ids"])
+
+
+def test_empty_index_returns_independent_lists():
+    result = NumpyVectorIndex().query(query_embeddings=[[1.0, 0.0]], n_results=3)
+    assert result == {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]}
+    result["ids"][0].append("x")
+    assert result["documents"] == [[]]